@@ -19,6 +19,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'oj_backend.settings')
 
 django_asgi_app = get_asgi_application()
 
+import oj_contest.routing
 import oj_submission.routing
 
 application = ProtocolTypeRouter({
@@ -26,7 +27,8 @@ application = ProtocolTypeRouter({
     'websocket': AllowedHostsOriginValidator(
         AuthMiddlewareStack(
             URLRouter(
-                oj_submission.routing.websocket_urlpatterns
+                oj_submission.routing.websocket_urlpatterns +
+                oj_contest.routing.websocket_urlpatterns
             )
         )
     )
@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
 
+from kombu import Queue
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = (BASE_DIR / 'secret.key').read_text()
@@ -74,7 +76,7 @@ else:
 ALLOWED_HOSTS = ['*']
 
 VENDOR_APPS = [
-    # 'channels',
+    'channels',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -126,7 +128,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'oj_backend.wsgi.application'
-# ASGI_APPLICATION = 'oj_backend.asgi.application'
+ASGI_APPLICATION = 'oj_backend.asgi.application'
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -194,6 +196,32 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_BROKER_URL = f"amqp://{os.getenv('OJ_MQ_HOST', '127.0.0.1')}:{os.getenv('OJ_MQ_PORT', 5672)}"
 CELERY_RESULT_BACKEND = f'{REDIS_URI}/1'
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Judge traffic classes, most urgent first. Run a worker pool per queue.
+JUDGE_QUEUES = {
+    'contest': {'queue': 'judge_contest', 'priority': 9},
+    'practice': {'queue': 'judge_practice', 'priority': 5},
+    'rejudge': {'queue': 'judge_rejudge', 'priority': 0},
+}
+VERDICT_CACHE_TIMEOUT = 7 * 86400  # s
+
+REJUDGE_BATCH_SIZE = 100
+REJUDGE_BATCH_INTERVAL = 10  # s
+REJUDGE_PROGRESS_TIMEOUT = 7 * 86400  # s
+
+CELERY_TASK_QUEUES = [Queue('celery')] + [
+    Queue(i['queue'], queue_arguments={'x-max-priority': 10})
+    for i in JUDGE_QUEUES.values()
+]
+
+# Corrects any drift of the incrementally maintained user statistics.
+CELERY_BEAT_SCHEDULE = {
+    'rebuild-user-stats': {
+        'task': 'oj_user.tasks.rebuild_user_stats',
+        'schedule': 86400,
+    },
+}
 
 CHANNEL_LAYERS = {
     'default': {
@@ -204,12 +232,42 @@ CHANNEL_LAYERS = {
     }
 }
 
+PROBLEM_COUNTER_FLUSH_INTERVAL = 5  # s
+
+RUNNING_CONTEST_CACHE_TIMEOUT = 5  # s, per process
+SOLVED_CACHE_TIMEOUT = 86400  # s
+# Submission counts are not part of the version, they lag this much.
+PROBLEM_RESPONSE_CACHE_TIMEOUT = 60  # s
+# PostgreSQL text search configuration of the problem search index.
+PROBLEM_SEARCH_CONFIG = os.getenv('OJ_PROBLEM_SEARCH_CONFIG', 'simple')
+
 PROBLEM_FILE_ROOT = Path(
     os.getenv('OJ_PROBLEM_FILE_ROOT', BASE_DIR / 'problem_files'))
 
 JUDGE_SERVER = f"{os.getenv('OJ_JUDGE_HOST', '127.0.0.1')}:{os.getenv('OJ_JUDGE_PORT', 8080)}"
+# host:port[:weight[:capacity]], comma separated, e.g. 10.0.0.1:8080:2:8
+JUDGE_SERVERS = []
+for _item in os.getenv('OJ_JUDGE_SERVERS', JUDGE_SERVER).split(','):
+    _host, _port, *_extra = _item.strip().split(':')
+    _weight, _capacity = (_extra + ['1', '4'][len(_extra):])[:2]
+    JUDGE_SERVERS.append({
+        'server': f'{_host}:{_port}',
+        'weight': int(_weight),
+        'capacity': int(_capacity),
+    })
+JUDGE_NODE_DRAIN_TIME = int(os.getenv('OJ_JUDGE_NODE_DRAIN_TIME', 30))  # s
+# Longer than any single judge task.
+JUDGE_INFLIGHT_TIMEOUT = int(os.getenv('OJ_JUDGE_INFLIGHT_TIMEOUT', 600))  # s
+JUDGE_POOL_SIZE = int(os.getenv('OJ_JUDGE_POOL_SIZE', 4))
+JUDGE_PING_INTERVAL = int(os.getenv('OJ_JUDGE_PING_INTERVAL', 30))  # s
 JUDGE_DATA_ROOT = Path(os.getenv('OJ_JUDGE_DATA_ROOT',
                                  BASE_DIR / 'judge_data'))
 SUBMISSION_ROOT = JUDGE_DATA_ROOT / 'submission'
+SUBMISSION_OUTPUT_HEAD = 1024  # bytes kept from the start of each output
+SUBMISSION_OUTPUT_TAIL = int(os.getenv('OJ_SUBMISSION_OUTPUT_TAIL', 63)) * 1024
 TEST_DATA_ROOT = JUDGE_DATA_ROOT / 'test_data'
 SPJ_ROOT = JUDGE_DATA_ROOT / 'spj'
+SPJ_COMPILE_COMMAND = [
+    'g++', '-O2', '-std=c++17', '-I{include}', '{src}', '-o', '{exe}'
+]
+SPJ_COMPILE_TIMEOUT = 60  # s
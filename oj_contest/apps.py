@@ -6,3 +6,6 @@ class ContestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'oj_contest'
     verbose_name = _('Contest')
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,45 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db.models import Q
+
+from .models import Contest
+
+
+class ContestConsumer(AsyncJsonWebsocketConsumer):
+    room_name = None
+    room_group_name = None
+
+    @database_sync_to_async
+    def can_view(self, user):
+        # Same rule as the ranking endpoint, which requires a login.
+        if user.is_anonymous:
+            return False
+        contests = Contest.objects.filter(id=self.room_name,
+                                          problem_list_mode=False)
+        if not (user.is_superuser or 'contest' in user.permissions):
+            contests = contests.filter(Q(is_hidden=False) | Q(users=user.id))
+        return contests.exists()
+
+    async def connect(self):
+        self.room_name = self.scope['url_route']['kwargs']['contest_id']
+        self.room_group_name = 'contest_%s' % self.room_name
+
+        if not await self.can_view(self.scope['user']):
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(
+            self.room_group_name,
+            self.channel_name
+        )
+
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(
+            self.room_group_name,
+            self.channel_name
+        )
+
+    async def ranking_message(self, event):
+        await self.send_json(event['message'])
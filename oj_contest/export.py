@@ -0,0 +1,68 @@
+import csv
+from itertools import islice
+
+from . import ranking
+
+CHUNK_SIZE = 500
+
+SUBMISSION_FIELDS = [
+    'id', 'user_id', 'user__username', 'problem_id', 'language', 'status',
+    'score', 'execute_time', 'execute_memory', 'create_time'
+]
+
+
+class Echo:
+    """A file-like object whose ``write`` hands the line back."""
+
+    def write(self, value):
+        return value
+
+
+def stream(rows):
+    # The BOM lets spreadsheet programs detect UTF-8 names.
+    yield '\ufeff'
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ranking_rows(contest):
+    """The live scoreboard, one row per user, read in chunks."""
+    problems = list(contest.problems.values_list('id', 'title'))
+    header = ['rank', 'id', 'username', 'real_name', 'score', 'penalty']
+    for _id, title in problems:
+        header += [
+            title, f'{title} status', f'{title} attempts', f'{title} time'
+        ]
+    yield header
+    ranks = ranking.get_queryset(contest).iterator(chunk_size=CHUNK_SIZE)
+    start = 0
+    while True:
+        chunk = list(islice(ranks, CHUNK_SIZE))
+        if not chunk:
+            break
+        for item in ranking.serialize(contest, chunk, start=start):
+            cells = {i['id']: i for i in item['problems']}
+            row = [
+                item['rank'], item['id'], item['username'],
+                item['real_name'], item['score'], item['penalty']
+            ]
+            for problem_id, _title in problems:
+                cell = cells.get(problem_id)
+                if cell is None:
+                    row += [''] * 4
+                else:
+                    row += [
+                        cell['score'], cell['status'], cell['attempts'],
+                        cell['time']
+                    ]
+            yield row
+        start += len(chunk)
+
+
+def submission_rows(contest):
+    yield [i.replace('user__', '') for i in SUBMISSION_FIELDS]
+    submissions = ranking.get_submissions(contest).order_by('id').values_list(
+        *SUBMISSION_FIELDS)
+    for row in submissions.iterator(chunk_size=CHUNK_SIZE):
+        yield [*row[:-1], row[-1].isoformat()]
@@ -0,0 +1,107 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oj_contest import ranking
+from oj_contest.models import (Contest, ContestProblem, ContestUser,
+                               RuleChoices)
+from oj_problem.models import Problem
+from oj_submission.models import StatusChoices, Submission
+from oj_user.models import User
+
+STATUSES = [
+    StatusChoices.ACCEPTED, StatusChoices.WRONG_ANSWER,
+    StatusChoices.TIME_LIMIT_EXCEEDED, StatusChoices.COMPILE_ERROR
+]
+MINUTES = 300
+
+
+class Command(BaseCommand):
+    help = ('Time ranking rebuilds, updates and page reads on a seeded '
+            'contest, rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--problems', type=int, default=12)
+        parser.add_argument('--submissions', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            contest = self.seed(options)
+            self.measure(contest)
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        start = time.monotonic()
+        now = timezone.now()
+        contest = Contest.objects.create(
+            title='benchmark',
+            start_time=now - timedelta(minutes=MINUTES),
+            end_time=now + timedelta(hours=1),
+            is_hidden=True)
+        prefix = f'benchmark_{int(time.time())}_'
+        Problem.objects.bulk_create([
+            Problem(title=f'{prefix}{i}', _is_hidden=True)
+            for i in range(options['problems'])
+        ])
+        problems = list(Problem.objects.filter(title__startswith=prefix))
+        User.objects.bulk_create([
+            User(username=f'{prefix}{i}') for i in range(options['users'])
+        ])
+        users = list(User.objects.filter(username__startswith=prefix))
+        ContestProblem.objects.bulk_create(
+            [ContestProblem(contest=contest, problem=i) for i in problems])
+        ContestUser.objects.bulk_create(
+            [ContestUser(contest=contest, user=i) for i in users])
+        submissions = []
+        for _ in range(options['submissions']):
+            status = rnd.choice(STATUSES)
+            submissions.append(
+                Submission(user=rnd.choice(users),
+                           problem=rnd.choice(problems),
+                           source='',
+                           language='c',
+                           status=status,
+                           score=100 if status == StatusChoices.ACCEPTED
+                           else rnd.choice([0, 20, 50])))
+        Submission.objects.bulk_create(submissions, batch_size=2000)
+        # create_time is set on insert, spread it over the contest.
+        minutes = {}
+        for i in Submission.objects.filter(problem__in=problems).values_list(
+                'id', flat=True):
+            minutes.setdefault(rnd.randrange(MINUTES), []).append(i)
+        for minute, submission_ids in minutes.items():
+            Submission.objects.filter(id__in=submission_ids).update(
+                create_time=contest.start_time + timedelta(minutes=minute))
+        self.stdout.write(f'Seeded in {time.monotonic() - start:.1f}s')
+        return contest
+
+    def measure(self, contest):
+        for rule in RuleChoices.values:
+            contest.rule = rule
+            contest.save()
+            elapsed, queries = self.timed(lambda: ranking.rebuild(contest))
+            self.stdout.write(f'{rule} rebuild: {elapsed:.2f}s, '
+                              f'{queries} queries')
+        submission = Submission.objects.filter(
+            problem__contests__contest=contest).order_by('?').first()
+        elapsed, queries = self.timed(lambda: ranking.update(submission))
+        self.stdout.write(f'incremental update: {elapsed * 1000:.1f}ms, '
+                          f'{queries} queries')
+        elapsed, queries = self.timed(lambda: ranking.serialize(
+            contest, ranking.get_queryset(contest)[:50]))
+        self.stdout.write(f'50-row page: {elapsed * 1000:.1f}ms, '
+                          f'{queries} queries')
+
+    @staticmethod
+    def timed(func):
+        start = time.monotonic()
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return time.monotonic() - start, len(queries)
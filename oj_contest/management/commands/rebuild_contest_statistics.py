@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from oj_contest import statistics
+from oj_contest.models import Contest
+
+
+class Command(BaseCommand):
+    help = 'Recompute contest problem statistics from submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('contest_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        contests = Contest.objects.filter(problem_list_mode=False)
+        if options['contest_ids']:
+            contests = contests.filter(id__in=options['contest_ids'])
+        total = 0
+        for contest in contests.order_by('id').iterator():
+            statistics.rebuild(contest)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} contests.'))
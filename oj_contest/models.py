@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -6,6 +8,20 @@ from oj_user.models import User
 from oj_problem.models import Problem
 
 
+class RuleChoices(models.TextChoices):
+    IOI = 'ioi', _('IOI (highest score)')
+    OI = 'oi', _('OI (last submission)')
+    ICPC = 'icpc', _('ICPC (solved and penalty)')
+
+
+class ContestQuerySet(models.QuerySet):
+
+    def with_joined(self, user):
+        return self.annotate(joined=models.Exists(
+            ContestUser.objects.filter(contest=models.OuterRef('pk'),
+                                       user=user.id)))
+
+
 class Contest(models.Model):
     title = models.CharField(_('title'), max_length=50)
     description = models.TextField(_('description'), null=True, blank=True)
@@ -15,10 +31,29 @@ class Contest(models.Model):
     end_time = models.DateTimeField(_('end time'), null=True, blank=True)
     is_hidden = models.BooleanField(_('hide'), default=False)
     allow_sign_up = models.BooleanField(_('allow sign up'), default=True)
+    rule = models.CharField(
+        _('rule'),
+        max_length=10,
+        choices=RuleChoices.choices,
+        default=RuleChoices.IOI,
+    )
+    freeze_minutes = models.IntegerField(
+        _('freeze minutes'),
+        default=0,
+        help_text=_('freeze the ranking this many minutes before the end, '
+                    '0 for never'))
 
     problems = models.ManyToManyField(Problem, through='ContestProblem')
     users = models.ManyToManyField(User, through='ContestUser')
 
+    objects = ContestQuerySet.as_manager()
+
+    @property
+    def freeze_time(self):
+        if not self.freeze_minutes:
+            return None
+        return self.end_time - timedelta(minutes=self.freeze_minutes)
+
     @property
     def hide_discussions(self):
         return any([
@@ -47,6 +82,20 @@ class ContestProblem(models.Model):
         related_name='contests',
         on_delete=models.CASCADE,
     )
+    # Statistics over the participants' submissions in the contest.
+    attempts = models.IntegerField(_('attempts'), default=0)
+    accepted = models.IntegerField(_('accepted'), default=0)
+    first_blood_user = models.ForeignKey(
+        User,
+        verbose_name=_('first blood user'),
+        related_name='+',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    first_blood_time = models.DateTimeField(_('first blood time'),
+                                            null=True,
+                                            blank=True)
 
     class Meta:
         verbose_name = _('contest problem')
@@ -76,3 +125,93 @@ class ContestUser(models.Model):
 
     def __str__(self):
         return f'{self.contest.title} - {self.user.username}'
+
+
+class ContestRank(models.Model):
+    contest = models.ForeignKey(
+        Contest,
+        verbose_name=_('contest'),
+        related_name='ranks',
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name=_('user'),
+        related_name='contest_ranks',
+        on_delete=models.CASCADE,
+    )
+    score = models.IntegerField(_('score'), default=0)
+    penalty = models.IntegerField(_('penalty'), default=0)
+    latest_submit = models.DateTimeField(_('latest submit'),
+                                         null=True,
+                                         blank=True)
+
+    class Meta:
+        verbose_name = _('contest rank')
+        verbose_name_plural = _('contest ranks')
+        unique_together = ['contest', 'user']
+        indexes = [
+            models.Index(
+                fields=['contest', '-score', 'penalty', 'latest_submit'])
+        ]
+
+
+class ContestRankCell(models.Model):
+    contest = models.ForeignKey(
+        Contest,
+        verbose_name=_('contest'),
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name=_('user'),
+        on_delete=models.CASCADE,
+    )
+    problem = models.ForeignKey(
+        Problem,
+        verbose_name=_('problem'),
+        on_delete=models.CASCADE,
+    )
+    submission = models.ForeignKey(
+        'oj_submission.Submission',
+        verbose_name=_('submission'),
+        on_delete=models.CASCADE,
+    )
+    score = models.IntegerField(_('score'), default=0)
+    status = models.IntegerField(_('status'))
+    time = models.DateTimeField(_('time'))
+    attempts = models.IntegerField(_('attempts'), default=0)
+    penalty = models.IntegerField(_('penalty'), default=0)
+
+    class Meta:
+        verbose_name = _('contest rank cell')
+        verbose_name_plural = _('contest rank cells')
+        unique_together = ['contest', 'user', 'problem']
+
+
+class SnapshotKindChoices(models.TextChoices):
+    FROZEN = 'frozen', _('frozen')
+    FINAL = 'final', _('final')
+
+
+class ContestRankSnapshot(models.Model):
+    contest = models.ForeignKey(
+        Contest,
+        verbose_name=_('contest'),
+        related_name='rank_snapshots',
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField(
+        _('kind'),
+        max_length=10,
+        choices=SnapshotKindChoices.choices,
+    )
+    version = models.IntegerField(_('version'), default=1)
+    data = models.JSONField(_('ranking data'), default=list)
+    etag = models.CharField(_('etag'), max_length=32)
+    create_time = models.DateTimeField(_('create time'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('contest rank snapshot')
+        verbose_name_plural = _('contest rank snapshots')
+        unique_together = ['contest', 'kind', 'version']
@@ -0,0 +1,387 @@
+import hashlib
+import json
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import (Case, Count, F, IntegerField, Max, OuterRef, Q,
+                              Subquery, Sum, When)
+from django.utils import timezone
+from oj_submission.models import StatusChoices, Submission
+from oj_user.serializers import UserBriefSerializer
+
+from .models import (Contest, ContestRank, ContestRankCell,
+                     ContestRankSnapshot, ContestUser, RuleChoices,
+                     SnapshotKindChoices)
+
+ICPC_PENALTY = 20  # minutes per rejected attempt
+
+# Compile errors, system errors and unjudged submissions are free.
+COUNTED_STATUS = Q(status__in=[
+    StatusChoices.WRONG_ANSWER, StatusChoices.ACCEPTED,
+    StatusChoices.TIME_LIMIT_EXCEEDED, StatusChoices.MEMORY_LIMIT_EXCEEDED,
+    StatusChoices.RUNTIME_ERROR
+])
+
+
+def get_submissions(contest, until=None):
+    return Submission.objects.filter(
+        create_time__range=(contest.start_time, until or contest.end_time),
+        problem__in=contest.problems.all(),
+        user__in=contest.users.all(),
+    )
+
+
+def _same_cell(contest, until):
+    return Submission.objects.filter(
+        create_time__range=(contest.start_time, until or contest.end_time),
+        user=OuterRef('user_id'),
+        problem=OuterRef('problem_id'),
+    )
+
+
+def _cell_order(contest):
+    if contest.rule == RuleChoices.OI:
+        # Only the last submission counts.
+        return ['-create_time']
+    elif contest.rule == RuleChoices.ICPC:
+        # The first accepted submission, or the last one if none is.
+        accepted = Q(status=StatusChoices.ACCEPTED)
+        return [
+            Case(When(accepted, then=0),
+                 default=1,
+                 output_field=IntegerField()).asc(),
+            Case(When(accepted, then=F('create_time'))).asc(),
+            '-create_time',
+        ]
+    # IOI: the earliest of the highest scored submissions.
+    return ['-score', 'create_time']
+
+
+def _compute_cells(contest, submissions, until=None):
+    """Rank cells of ``submissions`` under the rule of ``contest``.
+
+    Two set based queries whatever the number of submissions: one picks
+    the submission each cell shows, one counts the attempts made before
+    the first accepted submission.
+    """
+    chosen = _same_cell(contest, until).order_by(
+        *_cell_order(contest)).values('id')[:1]
+    first_accepted = _same_cell(contest, until).filter(
+        status=StatusChoices.ACCEPTED).order_by('create_time').values(
+            'create_time')[:1]
+    attempts = submissions.annotate(
+        first_accepted=Subquery(first_accepted)).values(
+            'user_id', 'problem_id').annotate(attempts=Count(
+                'id',
+                filter=COUNTED_STATUS
+                & (Q(first_accepted__isnull=True)
+                   | Q(create_time__lt=F('first_accepted')))))
+    attempts = {(i['user_id'], i['problem_id']): i['attempts']
+                for i in attempts}
+    cells = []
+    for submission in submissions.filter(id=Subquery(chosen)):
+        cell = ContestRankCell(
+            contest=contest,
+            user_id=submission.user_id,
+            problem_id=submission.problem_id,
+            submission=submission,
+            score=submission.score,
+            status=submission.status,
+            time=submission.create_time,
+            attempts=attempts.get(
+                (submission.user_id, submission.problem_id), 0),
+        )
+        if contest.rule == RuleChoices.ICPC:
+            solved = submission.status == StatusChoices.ACCEPTED
+            cell.score = int(solved)
+            if solved:
+                minutes = (cell.time - contest.start_time).total_seconds()
+                cell.penalty = int(minutes // 60) + cell.attempts * ICPC_PENALTY
+        cells.append(cell)
+    return cells
+
+
+def _update_ranks(contest, user_ids):
+    totals = ContestRankCell.objects.filter(
+        contest=contest, user__in=user_ids).values('user_id').annotate(
+            total=Sum('score'), penalty=Sum('penalty'), latest=Max('time'))
+    totals = {i['user_id']: i for i in totals}
+    ranks = [
+        ContestRank(
+            contest=contest,
+            user_id=user_id,
+            score=totals.get(user_id, {}).get('total', 0),
+            penalty=totals.get(user_id, {}).get('penalty', 0),
+            latest_submit=totals.get(user_id, {}).get('latest'),
+        ) for user_id in user_ids
+    ]
+    ContestRank.objects.filter(contest=contest, user__in=user_ids).delete()
+    ContestRank.objects.bulk_create(ranks)
+
+
+def _lock_users(contest, user_ids=None):
+    """Serialize writers of the rows of ``user_ids``, all by default.
+
+    The rows are deleted and created again, two writers at once would
+    both create them.
+    """
+    users = ContestUser.objects.select_for_update().filter(contest=contest)
+    if user_ids is not None:
+        users = users.filter(user__in=user_ids)
+    return list(users.order_by('id').values_list('user_id', flat=True))
+
+
+@transaction.atomic
+def rebuild(contest):
+    user_ids = _lock_users(contest)
+    ContestRankCell.objects.filter(contest=contest).delete()
+    if contest.problem_list_mode:
+        ContestRank.objects.filter(contest=contest).delete()
+        return
+    ContestRankCell.objects.bulk_create(
+        _compute_cells(contest, get_submissions(contest)))
+    _update_ranks(contest, user_ids)
+
+
+def add_users(contest, user_ids):
+    ContestRank.objects.bulk_create(
+        [ContestRank(contest=contest, user_id=i) for i in user_ids],
+        ignore_conflicts=True)
+
+
+def update(submission):
+    """Refresh the cells ``submission`` affects, returns the contests."""
+    contests = Contest.objects.filter(
+        problem_list_mode=False,
+        problems=submission.problem_id,
+        users=submission.user_id,
+        start_time__lte=submission.create_time,
+        end_time__gte=submission.create_time,
+    ).distinct()
+    for contest in contests:
+        with transaction.atomic():
+            _lock_users(contest, [submission.user_id])
+            ContestRankCell.objects.filter(
+                contest=contest,
+                user=submission.user_id,
+                problem=submission.problem_id,
+            ).delete()
+            ContestRankCell.objects.bulk_create(
+                _compute_cells(
+                    contest,
+                    get_submissions(contest).filter(
+                        user=submission.user_id,
+                        problem=submission.problem_id),
+                ))
+            _update_ranks(contest, [submission.user_id])
+    return list(contests)
+
+
+def get_queryset(contest):
+    return ContestRank.objects.filter(contest=contest).select_related(
+        'user').order_by('-score', 'penalty',
+                         F('latest_submit').asc(nulls_first=True), 'user_id')
+
+
+def _ahead(rank):
+    """Rows ``get_queryset`` orders before ``rank``."""
+    if rank.latest_submit is None:
+        earlier = Q(latest_submit__isnull=True, user_id__lt=rank.user_id)
+    else:
+        earlier = (Q(latest_submit__isnull=True)
+                   | Q(latest_submit__lt=rank.latest_submit)
+                   | Q(latest_submit=rank.latest_submit,
+                       user_id__lt=rank.user_id))
+    return (Q(score__gt=rank.score)
+            | Q(score=rank.score, penalty__lt=rank.penalty)
+            | Q(score=rank.score, penalty=rank.penalty) & earlier)
+
+
+def is_live(contest):
+    """Whether everyone may see the ranking as it changes."""
+    now = timezone.now()
+    return now < contest.end_time and (contest.freeze_time is None
+                                       or now < contest.freeze_time)
+
+
+def publish(contest, user_ids):
+    """Push the rows of ``user_ids`` to the ``contest_<id>`` group."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not is_live(contest):
+        return
+    users = []
+    for rank in get_queryset(contest).filter(user__in=user_ids):
+        position = ContestRank.objects.filter(contest=contest).filter(
+            _ahead(rank)).count()
+        users += serialize(contest, [rank], start=position)
+    try:
+        async_to_sync(channel_layer.group_send)(
+            f'contest_{contest.id}', {
+                'type': 'ranking.message',
+                'message': {
+                    'users': users,
+                    'time': timezone.now().isoformat(),
+                },
+            })
+    except OSError:
+        # Subscribers can still poll the ranking.
+        pass
+
+
+def compute(contest, until=None):
+    """Rank the submissions made before ``until`` without the tables."""
+    cells = _compute_cells(contest, get_submissions(contest, until), until)
+    ranks = {
+        i.user_id: ContestRank(contest=contest, user=i.user)
+        for i in ContestUser.objects.filter(
+            contest=contest).select_related('user')
+    }
+    for cell in cells:
+        rank = ranks[cell.user_id]
+        rank.score += cell.score
+        rank.penalty += cell.penalty
+        rank.latest_submit = max(filter(None, [rank.latest_submit,
+                                               cell.time]))
+    ranks = sorted(
+        ranks.values(),
+        key=lambda x: (-x.score, x.penalty, x.latest_submit is not None,
+                       x.latest_submit, x.user_id),
+    )
+    return serialize(contest, ranks, cells)
+
+
+def serialize(contest, ranks, cells=None, start=0):
+    ranks = list(ranks)
+    problems = list(contest.problems.values_list('id', 'title'))
+    order = {j[0]: i for i, j in enumerate(problems)}
+    titles = dict(problems)
+    if cells is None:
+        cells = ContestRankCell.objects.filter(
+            contest=contest,
+            user__in=[i.user_id for i in ranks],
+            problem__in=list(titles),
+        )
+    user_cells = defaultdict(list)
+    for cell in cells:
+        if cell.problem_id in titles:
+            user_cells[cell.user_id].append(cell)
+    res = []
+    for index, rank in enumerate(ranks, start + 1):
+        items = sorted(user_cells[rank.user_id],
+                       key=lambda x: order[x.problem_id])
+        res.append({
+            **UserBriefSerializer(rank.user).data,
+            'rank':
+            index,
+            'problems': [{
+                'id': i.problem_id,
+                'title': titles[i.problem_id],
+                'status': i.status,
+                'score': i.score,
+                'time': i.time.isoformat(),
+                'submission_id': i.submission_id,
+                'attempts': i.attempts,
+            } for i in items],
+            'penalty':
+            rank.penalty,
+            'score':
+            rank.score,
+        })
+    return res
+
+
+def is_settled(contest, until=None):
+    return not get_submissions(contest, until).filter(status__in=[
+        StatusChoices.PENDING, StatusChoices.JUDGING
+    ]).exists()
+
+
+def _make_snapshot(contest, kind):
+    # From the submissions, the tables of contests older than them may
+    # never have been built.
+    data = compute(
+        contest,
+        contest.freeze_time if kind == SnapshotKindChoices.FROZEN else None)
+    etag = hashlib.md5(
+        json.dumps(data, cls=DjangoJSONEncoder).encode()).hexdigest()
+    return ContestRankSnapshot(contest=contest,
+                               kind=kind,
+                               data=data,
+                               etag=etag,
+                               create_time=timezone.now())
+
+
+def _latest_snapshot(contest, kind):
+    return contest.rank_snapshots.filter(kind=kind).order_by(
+        '-version').first()
+
+
+def _lock(contest):
+    """Serialize snapshot writers of ``contest`` on its row."""
+    Contest.objects.select_for_update().get(id=contest.id)
+
+
+def take_snapshot(contest, kind):
+    """Save a new immutable version of the ``kind`` snapshot."""
+    snapshot = _make_snapshot(contest, kind)
+    with transaction.atomic():
+        _lock(contest)
+        latest = _latest_snapshot(contest, kind)
+        snapshot.version = latest.version + 1 if latest else 1
+        snapshot.save()
+    return snapshot
+
+
+def _take_first_snapshot(contest, kind):
+    """The first ``kind`` snapshot, taken once however many ask at once."""
+    try:
+        with transaction.atomic():
+            _lock(contest)
+            snapshot = _latest_snapshot(contest, kind)
+            if snapshot is None:
+                if not ContestRank.objects.filter(contest=contest).exists():
+                    # The contest predates the tables, admins read them.
+                    rebuild(contest)
+                snapshot = _make_snapshot(contest, kind)
+                snapshot.version = 1
+                snapshot.save()
+            return snapshot
+    except IntegrityError:
+        # Databases without row locks, another request saved it first.
+        return _latest_snapshot(contest, kind)
+
+
+def get_snapshot(contest, kind):
+    snapshot = _latest_snapshot(contest, kind)
+    if snapshot is not None:
+        return snapshot
+    until = (contest.freeze_time
+             if kind == SnapshotKindChoices.FROZEN else contest.end_time)
+    if is_settled(contest, until):
+        return _take_first_snapshot(contest, kind)
+    elif kind == SnapshotKindChoices.FINAL:
+        return None
+    # Submissions before the freeze are still judging, keep a short lived
+    # snapshot until they are all done.
+    key = f'contest_ranking_{contest.id}_{kind}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _make_snapshot(contest, kind)
+        cache.set(key, snapshot, 60)
+    return snapshot
+
+
+def get_public_snapshot(contest):
+    """The snapshot non-admins see right now, None for the live ranking."""
+    now = timezone.now()
+    if now >= contest.end_time:
+        snapshot = get_snapshot(contest, SnapshotKindChoices.FINAL)
+        if snapshot is not None:
+            return snapshot
+    if contest.freeze_time is not None and now >= contest.freeze_time:
+        return get_snapshot(contest, SnapshotKindChoices.FROZEN)
+    return None
@@ -0,0 +1,72 @@
+"""Ids of the contests running right now and of their problems.
+
+Kept in the shared cache until the next contest starts or ends, and in
+each process for ``RUNNING_CONTEST_CACHE_TIMEOUT`` seconds on top.
+Contest saves clear both, other processes catch up within that time.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Contest, ContestProblem
+
+CACHE_KEY = 'running_contests'
+MAX_TIMEOUT = 86400  # s
+
+_local = {'data': None, 'expires': 0}
+
+
+def _load():
+    now = timezone.now()
+    running = Contest.objects.filter(start_time__lt=now, end_time__gt=now)
+    problems = {i: [] for i in running.values_list('id', flat=True)}
+    for contest_id, problem_id in ContestProblem.objects.filter(
+            contest__in=list(problems)).values_list('contest_id',
+                                                    'problem_id'):
+        problems[contest_id].append(problem_id)
+    boundaries = [
+        running.aggregate(i=Min('end_time'))['i'],
+        Contest.objects.filter(start_time__gte=now).aggregate(
+            i=Min('start_time'))['i'],
+    ]
+    boundaries = [i.timestamp() for i in boundaries if i is not None]
+    return {
+        'contests': dict(problems),
+        'until': min(boundaries, default=now.timestamp() + MAX_TIMEOUT),
+    }
+
+
+def get_running():
+    """``{contest_id: [problem_id, ...]}`` of the running contests."""
+    now = time.time()
+    data = _local['data']
+    if data is not None and now < _local['expires']:
+        return data['contests']
+    data = cache.get(CACHE_KEY)
+    if data is None or now >= data['until']:
+        data = _load()
+        cache.set(CACHE_KEY, data, max(1, int(data['until'] - now)))
+    _local['data'] = data
+    _local['expires'] = min(now + settings.RUNNING_CONTEST_CACHE_TIMEOUT,
+                            data['until'])
+    return data['contests']
+
+
+def contest_ids():
+    return list(get_running())
+
+
+def problem_ids(contest_ids=None):
+    """Problems of the running contests, or of those in ``contest_ids``."""
+    running = get_running()
+    if contest_ids is not None:
+        running = {i: running[i] for i in contest_ids if i in running}
+    return {j for i in running.values() for j in i}
+
+
+def clear():
+    _local['data'] = None
+    cache.delete(CACHE_KEY)
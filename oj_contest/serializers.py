@@ -2,9 +2,9 @@ from django.utils import timezone
 from oj_problem.models import Problem
 from oj_problem.serializers import ProblemSerializer
 from oj_user.models import User
-from oj_user.serializers import UserBriefSerializer
 from rest_framework import serializers
 
+from . import statistics
 from .models import Contest, ContestUser
 
 
@@ -14,12 +14,14 @@ class ContestJoined(serializers.ReadOnlyField):
         pass
 
     def to_representation(self, value):
+        if hasattr(value, 'joined'):
+            return value.joined
         request = self.context.get('request')
-        return value.filter(id=request.user.id).exists()
+        return value.users.filter(id=request.user.id).exists()
 
 
 class ContestSerializer(serializers.ModelSerializer):
-    joined = ContestJoined(source='users')
+    joined = ContestJoined(source='*')
 
     class Meta:
         model = Contest
@@ -43,7 +45,7 @@ class ProblemsField(serializers.Field):
         if 'contest' not in request.user.permissions and value.start_time > timezone.now(
         ):
             return []
-        queryset = value.problems.all()
+        queryset = value.problems.with_visibility().prefetch_related('tags')
         return ProblemSerializer(queryset, many=True,
                                  context=self.context).data
 
@@ -51,25 +53,41 @@ class ProblemsField(serializers.Field):
         return {'problems': [Problem.objects.get(id=i) for i in data]}
 
 
-class UsersField(serializers.Field):
+class StatisticsField(serializers.ReadOnlyField):
 
     def to_representation(self, value):
-        return UserBriefSerializer(value, many=True).data
+        request = self.context.get('request')
+        if value.problem_list_mode:
+            return []
+        if 'contest' not in request.user.permissions:
+            now = timezone.now()
+            if value.start_time > now:
+                return []
+            freeze_time = value.freeze_time
+            if freeze_time is not None and freeze_time <= now < value.end_time:
+                # Would reveal the results the frozen ranking hides.
+                return None
+        return statistics.serialize(value)
+
+
+class UsersField(serializers.Field):
+    """Participants are written here and read from ``users/`` in pages."""
 
     def to_internal_value(self, data):
-        return [User.objects.get(id=i) for i in data]
+        return list(User.objects.filter(id__in=data))
 
 
 class ContestDetailSerializer(serializers.ModelSerializer):
-    joined = ContestJoined(source='users')
+    joined = ContestJoined(source='*')
     problems = ProblemsField(required=False, source='*')
-    users = UsersField(required=False)
+    users = UsersField(required=False, write_only=True)
+    statistics = StatisticsField(source='*')
 
     class Meta:
         model = Contest
         fields = [
             'id', 'title', 'start_time', 'end_time', 'joined', 'description',
-            'problem_list_mode', 'is_hidden', 'allow_sign_up', 'problems',
-            'users'
+            'problem_list_mode', 'is_hidden', 'allow_sign_up', 'rule',
+            'freeze_minutes', 'problems', 'users', 'statistics'
         ]
         read_only_fields = ['id']
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import running
+from .models import Contest, ContestProblem
+
+
+@receiver(post_save, sender=Contest)
+@receiver(post_delete, sender=Contest)
+@receiver(post_save, sender=ContestProblem)
+@receiver(post_delete, sender=ContestProblem)
+@receiver(m2m_changed, sender=ContestProblem)
+def clear_running_contests(**kwargs):
+    transaction.on_commit(running.clear)
@@ -0,0 +1,75 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from oj_submission.models import StatusChoices
+from oj_user.serializers import UserBriefSerializer
+
+from . import ranking
+from .models import ContestProblem
+
+JUDGED = ~Q(status__in=[StatusChoices.PENDING, StatusChoices.JUDGING])
+
+
+def rebuild(contest, problem_ids=None):
+    """Recompute the problem statistics of ``contest`` from submissions."""
+    submissions = ranking.get_submissions(contest)
+    rows = ContestProblem.objects.filter(contest=contest)
+    if problem_ids is not None:
+        submissions = submissions.filter(problem__in=problem_ids)
+        rows = rows.filter(problem__in=problem_ids)
+    counts = submissions.values('problem_id').annotate(
+        attempts=Count('id', filter=JUDGED),
+        accepted=Count('id', filter=Q(status=StatusChoices.ACCEPTED)),
+    )
+    counts = {i['problem_id']: i for i in counts}
+    first_blood = submissions.filter(
+        problem=OuterRef('problem_id'),
+        status=StatusChoices.ACCEPTED).order_by('create_time', 'id')
+    rows = list(
+        rows.annotate(
+            blood_user=Subquery(first_blood.values('user_id')[:1]),
+            blood_time=Subquery(first_blood.values('create_time')[:1]),
+        ))
+    for row in rows:
+        count = counts.get(row.problem_id, {})
+        row.attempts = count.get('attempts', 0)
+        row.accepted = count.get('accepted', 0)
+        row.first_blood_user_id = row.blood_user
+        row.first_blood_time = row.blood_time
+    ContestProblem.objects.bulk_update(
+        rows,
+        ['attempts', 'accepted', 'first_blood_user', 'first_blood_time'],
+    )
+
+
+def update(contest, submission, rejudge=False):
+    """Count the verdict of ``submission`` in the statistics of ``contest``."""
+    if rejudge:
+        # The previous verdict was counted already, start over.
+        rebuild(contest, [submission.problem_id])
+        return
+    accepted = submission.status == StatusChoices.ACCEPTED
+    rows = ContestProblem.objects.filter(contest=contest,
+                                         problem=submission.problem_id)
+    rows.update(attempts=F('attempts') + 1,
+                accepted=F('accepted') + int(accepted))
+    if accepted:
+        rows.filter(
+            Q(first_blood_time__isnull=True)
+            | Q(first_blood_time__gt=submission.create_time)).update(
+                first_blood_user=submission.user_id,
+                first_blood_time=submission.create_time,
+            )
+
+
+def serialize(contest):
+    rows = ContestProblem.objects.filter(
+        contest=contest).select_related('first_blood_user').order_by('id')
+    return [{
+        'id': i.problem_id,
+        'attempts': i.attempts,
+        'accepted': i.accepted,
+        'ac_rate': round(i.accepted / i.attempts, 4) if i.attempts else 0,
+        'first_blood': None if i.first_blood_user is None else {
+            **UserBriefSerializer(i.first_blood_user).data,
+            'time': i.first_blood_time.isoformat(),
+        },
+    } for i in rows]
@@ -1,3 +1,52 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from oj_problem.models import Problem
+from oj_submission.models import StatusChoices, Submission
+from oj_user.models import User
+from rest_framework.test import APIClient
+
+from .models import (Contest, ContestProblem, ContestRank, ContestRankCell,
+                     ContestUser)
+
+
+class FinalRankingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.user = User.objects.create(username='contestant')
+        problem = Problem.objects.create(title='p')
+        cls.contest = Contest.objects.create(
+            title='ended',
+            start_time=now - timedelta(hours=2),
+            end_time=now - timedelta(hours=1))
+        ContestProblem.objects.create(contest=cls.contest, problem=problem)
+        ContestUser.objects.create(contest=cls.contest, user=cls.user)
+        submission = Submission.objects.create(user=cls.user,
+                                               problem=problem,
+                                               source='',
+                                               language='c',
+                                               status=StatusChoices.ACCEPTED,
+                                               score=100)
+        Submission.objects.filter(id=submission.id).update(
+            create_time=now - timedelta(hours=1, minutes=30))
+        # A contest older than the ranking tables.
+        ContestRankCell.objects.filter(contest=cls.contest).delete()
+        ContestRank.objects.filter(contest=cls.contest).delete()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
 
-# Create your tests here.
+    def test_first_final_snapshot_counts_submissions(self):
+        response = self.client.get(f'/contest/{self.contest.id}/ranking/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i['score'] for i in response.data['users']], [100])
+        snapshot = self.contest.rank_snapshots.get()
+        self.assertEqual(snapshot.data, response.data['users'])
+        self.assertEqual(
+            ContestRank.objects.get(contest=self.contest).score, 100)
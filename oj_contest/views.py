@@ -1,5 +1,5 @@
-from django.core.cache import cache
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
@@ -14,7 +14,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
-from .models import Contest
+from . import export, ranking, statistics
+from .models import Contest, ContestUser, SnapshotKindChoices
 from .serializers import ContestDetailSerializer, ContestSerializer
 
 
@@ -23,6 +24,12 @@ class ContestPagination(LimitOffsetPagination):
     max_limit = 200
 
 
+class RankingPagination(LimitOffsetPagination):
+    # Without ``limit`` the whole ranking is returned.
+    default_limit = None
+    max_limit = 200
+
+
 class ContestViewSet(ModelViewSet):
     permission_classes = [Granted | IsAuthenticatedAndReadOnly]
     permission = 'contest'
@@ -37,15 +44,28 @@ class ContestViewSet(ModelViewSet):
         if self.permission in self.request.user.permissions:
             queryset = Contest.objects.all()
         else:
+            joined = ContestUser.objects.filter(
+                user=self.request.user.id).values('contest_id')
             queryset = Contest.objects.filter(
-                Q(is_hidden=False) | Q(users=self.request.user.id)).distinct()
-        return queryset.order_by('-id')
+                Q(is_hidden=False) | Q(id__in=joined))
+        return queryset.with_joined(self.request.user).order_by('-id')
 
     def get_serializer_class(self):
         if self.action == 'list':
             return ContestSerializer
         return ContestDetailSerializer
 
+    def perform_create(self, serializer):
+        self._rebuild(serializer.save())
+
+    def perform_update(self, serializer):
+        self._rebuild(serializer.save())
+
+    def _rebuild(self, contest):
+        ranking.rebuild(contest)
+        if not contest.problem_list_mode:
+            statistics.rebuild(contest)
+
     @action(detail=True, methods=['get'], url_path='ranking')
     def get_ranking(self, request, pk):
         contest = self.get_object()
@@ -53,60 +73,71 @@ class ContestViewSet(ModelViewSet):
             return Response({'detail': _('No ranking for problem list mode.')})
         if contest.start_time > timezone.now():
             return Response({'detail': _('Contest has not started.')})
-        if not (self.permission in self.request.user.permissions
-                and request.GET.get('force_update') == 'true'):
-            data = cache.get(f'contest_ranking_{pk}')
-            if data is not None:
-                return Response(data)
-
-        res = {'users': [], 'time': timezone.now().isoformat()}
-
-        users = contest.users.all()
-        problems = contest.problems.all()
-        problem_ids = [i.id for i in problems]
-        for user in users:
-            submissions = user.submissions.filter(
-                create_time__range=(contest.start_time, contest.end_time),
-                problem_id__in=problem_ids,
-            ).order_by('create_time')
-            item = {
-                **UserBriefSerializer(user).data, 'latest_submit': 0,
-                'problems': []
+        is_admin = self.permission in self.request.user.permissions
+        if is_admin and request.GET.get('force_update') == 'true':
+            ranking.rebuild(contest)
+            if contest.end_time <= timezone.now():
+                ranking.take_snapshot(contest, SnapshotKindChoices.FINAL)
+
+        paginator = RankingPagination()
+        snapshot = None if is_admin else ranking.get_public_snapshot(contest)
+        if snapshot is None:
+            queryset = ranking.get_queryset(contest)
+            page = paginator.paginate_queryset(queryset, request, self)
+            res = {
+                'users':
+                ranking.serialize(
+                    contest,
+                    queryset if page is None else page,
+                    start=0 if page is None else paginator.offset,
+                ),
+                'time':
+                timezone.now().isoformat(),
             }
-            problems = {}
-            for submission in submissions:
-                if problems.get(submission.problem_id
-                                ) is None or submission.score > problems[
-                                    submission.problem_id]['score']:
-                    problems[submission.problem.id] = {
-                        'id': submission.problem.id,
-                        'title': submission.problem.title,
-                        'status': submission.status,
-                        'score': submission.score,
-                        'time': submission.create_time.isoformat(),
-                        'submission_id': submission.id,
-                    }
-                    item['latest_submit'] = max(
-                        item['latest_submit'],
-                        submission.create_time.timestamp(),
-                    )
-            item['score'] = sum([i['score'] for i in problems.values()])
-            for problem in problems.values():
-                item['problems'].append(problem)
-            item['problems'].sort(key=lambda x: problem_ids.index(x['id']))
-            res['users'].append(item)
-
-        res['users'].sort(key=lambda x: (-x['score'], x['latest_submit']))
-        for i in res['users']:
-            i.pop('latest_submit')
-
-        cache.set(
-            f'contest_ranking_{pk}',
-            res,
-            60 if contest.end_time > timezone.now() else None,
-        )
-
-        return Response(res)
+        else:
+            etag = f'"{snapshot.etag}"'
+            if etag in request.headers.get('If-None-Match', ''):
+                return Response(status=304, headers={'ETag': etag})
+            page = paginator.paginate_queryset(snapshot.data, request, self)
+            res = {
+                'users': snapshot.data if page is None else page,
+                'time': snapshot.create_time.isoformat(),
+                'frozen': snapshot.kind == SnapshotKindChoices.FROZEN,
+            }
+        if page is not None:
+            res['count'] = paginator.count
+        response = Response(res)
+        if snapshot is not None:
+            response['ETag'] = etag
+        return response
+
+    @action(detail=True,
+            methods=['get'],
+            permission_classes=[Granted],
+            url_path='export')
+    def get_export(self, request, pk):
+        contest = self.get_object()
+        kind = request.GET.get('type', 'ranking')
+        if kind == 'ranking':
+            if contest.problem_list_mode:
+                raise ValidationError(_('No ranking for problem list mode.'))
+            rows = export.ranking_rows(contest)
+        elif kind == 'submissions':
+            rows = export.submission_rows(contest)
+        else:
+            raise ValidationError(_('Unknown export type.'))
+        response = StreamingHttpResponse(export.stream(rows),
+                                         content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="contest_{contest.id}_{kind}.csv"')
+        return response
+
+    @action(detail=True, methods=['get'], url_path='users')
+    def get_users(self, request, pk):
+        contest = self.get_object()
+        page = self.paginate_queryset(contest.users.order_by('id'))
+        return self.get_paginated_response(
+            UserBriefSerializer(page, many=True).data)
 
     @action(detail=True,
             methods=['post'],
@@ -119,4 +150,5 @@ class ContestViewSet(ModelViewSet):
         elif contest.end_time < timezone.now():
             raise ValidationError(_('The contest is over.'))
         contest.users.add(request.user)
+        ranking.add_users(contest, [request.user.id])
         return Response(status=204)
@@ -15,9 +15,13 @@ class DiscussionSerializer(serializers.ModelSerializer):
     latest_reply_time = serializers.SerializerMethodField()
 
     def get_reply_count(self, obj):
+        if hasattr(obj, 'reply_count'):
+            return obj.reply_count
         return obj.replies.count()
 
     def get_latest_reply_time(self, obj):
+        if hasattr(obj, 'latest_reply_time'):
+            return obj.latest_reply_time
         return obj.replies.order_by('-create_time').first().create_time
 
     class Meta:
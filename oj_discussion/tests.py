@@ -1,3 +1,72 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oj_contest.models import Contest, ContestUser
+from oj_problem.models import Problem, ProblemSolve, Tags
+from oj_user.models import User
+from rest_framework.test import APIClient
+
+from .models import Discussion, Reply
+
+
+class DiscussionListQueryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.user = User.objects.create(username='viewer')
+        tags = [Tags.objects.create(name=f't{i}') for i in range(3)]
+        problems = [Problem.objects.create(title=f'p{i}') for i in range(5)]
+        for problem in problems:
+            problem.tags.set(tags[:2])
+        ProblemSolve.objects.create(user=cls.user, problem=problems[0])
+        contests = [
+            Contest.objects.create(title=f'c{i}',
+                                   start_time=now - timedelta(days=2),
+                                   end_time=now - timedelta(days=1))
+            for i in range(3)
+        ]
+        ContestUser.objects.create(contest=contests[0], user=cls.user)
+        for i in range(120):
+            discussion = Discussion.objects.create(
+                title=f'd{i}',
+                author=cls.user,
+                related_problem=problems[i % 6] if i % 6 < 5 else None,
+                related_contest=contests[i % 4] if i % 4 < 3 else None,
+            )
+            Reply.objects.bulk_create([
+                Reply(content='reply', author=cls.user, discussion=discussion)
+                for _ in range(i % 3)
+            ])
+
+    def setUp(self):
+        cache.clear()
+        cache.set('site_settings', {'enableDiscussion': True})
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        # The first request also loads the running contests into the cache.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        expected = self.count_queries('/discussion/?limit=10')
+        with self.assertNumQueries(expected):
+            response = self.client.get('/discussion/?limit=100')
+        self.assertEqual(len(response.data['results']), 100)
 
-# Create your tests here.
+    def test_admin_list_queries_do_not_grow_with_rows(self):
+        self.user.permissions = ['discussion']
+        self.user.save()
+        expected = self.count_queries('/discussion/?limit=10')
+        with self.assertNumQueries(expected):
+            response = self.client.get('/discussion/?limit=100')
+        self.assertEqual(len(response.data['results']), 100)
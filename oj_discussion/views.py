@@ -1,7 +1,6 @@
 from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Q
-from django.utils import timezone
+from django.db.models import Count, Max, Prefetch, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from oj_backend.permissions import (Granted, IsAuthenticatedAndReadCreate,
                                     Captcha)
@@ -13,7 +12,9 @@ from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from .models import Discussion, Reply
 from .serializers import DiscussionSerializer, ReplySerializer, ReplyBriefSerializer
+from oj_contest import running
 from oj_contest.models import Contest
+from oj_problem.models import Problem
 
 
 class DiscussionPagination(LimitOffsetPagination):
@@ -45,20 +46,27 @@ class DiscussionViewSet(ReadOnlyModelViewSet):
         elif self.permission in self.request.user.permissions:
             queryset = Discussion.objects
         else:
-            processing_contest = Contest.objects.filter(
-                start_time__lt=timezone.now(), end_time__gt=timezone.now())
             queryset = Discussion.objects
             # queryset = queryset.exclude(Q(_is_hidden=True))
             queryset = queryset.exclude(
                 Q(related_problem___is_hidden=True)
                 | Q(related_problem___hide_discussions=True)
-                | Q(related_problem__contests__contest__in=processing_contest))
+                | Q(related_problem__in=running.problem_ids()))
             queryset = queryset.exclude(
                 Q(related_contest__is_hidden=True)
-                | Q(related_contest__in=processing_contest))
+                | Q(related_contest__in=running.contest_ids()))
             # queryset = queryset | Discussion.objects.filter(
             #     Q(author=self.request.user))
-            queryset = queryset.distinct()
+        queryset = queryset.select_related('author').prefetch_related(
+            Prefetch(
+                'related_problem',
+                Problem.objects.with_visibility().prefetch_related('tags')),
+            Prefetch('related_contest',
+                     Contest.objects.with_joined(self.request.user)),
+        ).annotate(
+            reply_count=Count('replies'),
+            latest_reply_time=Max('replies__create_time'),
+        )
         return queryset.order_by('-id')
 
     def get_serializer_class(self):
@@ -6,3 +6,6 @@ class ProblemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'oj_problem'
     verbose_name = _('Problem')
+
+    def ready(self):
+        from . import signals  # noqa: F401
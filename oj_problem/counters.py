@@ -0,0 +1,91 @@
+import atexit
+import threading
+import time
+from collections import Counter
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.models import Count, F, Q
+
+from .models import Problem
+
+_lock = threading.Lock()
+_pending = Counter()
+_timer = None
+_due = None
+
+
+def incr(problem_id, field, delta=1):
+    """Buffer ``delta`` for ``Problem.<field>``, flushed as an F() update."""
+    global _timer, _due
+    with _lock:
+        _pending[problem_id, field] += delta
+        if _due is None:
+            _due = time.monotonic() + settings.PROBLEM_COUNTER_FLUSH_INTERVAL
+        if _timer is None:
+            _timer = threading.Timer(settings.PROBLEM_COUNTER_FLUSH_INTERVAL,
+                                     _flush_in_thread)
+            _timer.daemon = True
+            _timer.start()
+
+
+def flush():
+    global _timer, _due
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _due = None
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    updates = {}
+    for (problem_id, field), delta in pending.items():
+        if delta:
+            updates.setdefault(problem_id, {})[field] = F(field) + delta
+    for problem_id, fields in updates.items():
+        Problem.objects.filter(id=problem_id).update(**fields)
+
+
+def _flush_in_thread():
+    try:
+        flush()
+    finally:
+        connections.close_all()
+
+
+@worker_process_shutdown.connect
+def _flush_on_shutdown(**kwargs):
+    flush()
+
+
+# Web processes buffer too: flush on a clean exit, and after requests in
+# case the timer thread never runs (uWSGI without enable-threads).
+atexit.register(flush)
+
+
+@request_finished.connect
+def _flush_after_request(**kwargs):
+    if _due is not None and time.monotonic() >= _due:
+        flush()
+
+
+def recount(problem_ids):
+    """Recompute the counters of ``problem_ids`` from their submissions."""
+    from oj_submission.models import StatusChoices, Submission
+
+    counts = Submission.objects.filter(problem_id__in=problem_ids).values(
+        'problem_id').annotate(
+            total=Count('id'),
+            accepted=Count('id', filter=Q(status=StatusChoices.ACCEPTED)),
+        )
+    counts = {i['problem_id']: i for i in counts}
+    problems = list(Problem.objects.filter(id__in=problem_ids).only('id'))
+    for problem in problems:
+        count = counts.get(problem.id, {})
+        problem.submission_count = count.get('total', 0)
+        problem.accepted_count = count.get('accepted', 0)
+    Problem.objects.bulk_update(problems,
+                                ['submission_count', 'accepted_count'])
+    return len(problems)
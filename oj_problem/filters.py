@@ -1,9 +1,20 @@
-from django.db.models import Q
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 
+from . import search, tag_index
 from .models import Problem
 
 
+class ProblemSearchFilter(SearchFilter):
+    """``?search=`` over the full-text index, ranked."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search.search(queryset, ' '.join(terms))
+
+
 class ProblemFilter(filters.FilterSet):
     tags = filters.CharFilter(method='filter_by_tags')
 
@@ -12,10 +23,10 @@ class ProblemFilter(filters.FilterSet):
         fields = ['difficulty']
 
     def filter_by_tags(self, queryset, name, value):
-        tags = value.split(',')  # 假设标签是逗号分隔的字符串
-        if len(tags) == 0:
+        tags = {int(i) for i in value.split(',') if i.strip().isdigit()}
+        if not tags:
             return queryset
-        q = Q(tags__id=tags[0])
-        for tag in tags[1:]:
-            q &= Q(tags__id=tag)
-        return queryset.filter(q).distinct()
\ No newline at end of file
+        if len(tags) == 1:
+            # One join, a tag is on a problem at most once.
+            return queryset.filter(tags=tags.pop())
+        return queryset.filter(id__in=tag_index.problem_ids(tags))
@@ -0,0 +1,68 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from oj_problem import search
+from oj_problem.models import Problem
+
+
+class Command(BaseCommand):
+    help = ('Compare icontains and full-text problem search on seeded '
+            'problems, rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--problems', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            queries = self.seed(options)
+            for text in queries:
+                self.measure(text)
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        words = [
+            ''.join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 9)))
+            for _ in range(20000)
+        ]
+
+        def text(count):
+            return ' '.join(rnd.choices(words, k=count))
+
+        start = time.monotonic()
+        problems = [
+            Problem(title=text(4),
+                    background=text(40),
+                    description=text(250),
+                    hint=text(30),
+                    _is_hidden=True) for _ in range(options['problems'])
+        ]
+        Problem.objects.bulk_create(problems, batch_size=1000)
+        self.stdout.write(f'Seeded in {time.monotonic() - start:.1f}s')
+        # Two single words and a two-word query.
+        return [words[5], words[12345], f'{words[77]} {words[900]}']
+
+    def measure(self, text):
+        queryset = Problem.objects.all()
+        condition = Q()
+        for field in search.FIELDS:
+            condition |= Q(**{f'{field}__icontains': text.split()[0]})
+        start = time.monotonic()
+        count = queryset.filter(condition).count()
+        self.stdout.write(f'{text!r} icontains count: '
+                          f'{(time.monotonic() - start) * 1000:.1f}ms '
+                          f'({count})')
+        start = time.monotonic()
+        count = search.search(queryset, text).count()
+        self.stdout.write(f'{text!r} full-text count: '
+                          f'{(time.monotonic() - start) * 1000:.1f}ms '
+                          f'({count})')
+        start = time.monotonic()
+        list(search.search(queryset, text)[:50])
+        self.stdout.write(f'{text!r} full-text first page: '
+                          f'{(time.monotonic() - start) * 1000:.1f}ms')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from oj_problem import counters
+from oj_problem.models import Problem
+
+
+class Command(BaseCommand):
+    help = 'Recompute problem submission and accepted counts from submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        counters.flush()
+        chunk_size = options['chunk_size']
+        total = last_id = 0
+        while True:
+            problem_ids = list(
+                Problem.objects.filter(id__gt=last_id).order_by('id').
+                values_list('id', flat=True)[:chunk_size])
+            if not problem_ids:
+                break
+            total += counters.recount(problem_ids)
+            last_id = problem_ids[-1]
+            self.stdout.write(f'{total} problems recounted')
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} problems.'))
@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def normalized_md5(data):
+    data = b'\n'.join(map(bytes.rstrip, data.rstrip().splitlines()))
+    return hashlib.md5(data).hexdigest()
+
+
+def _describe(file):
+    data = file.read_bytes()
+    stat = file.stat()
+    return {
+        'size': stat.st_size,
+        'lines': data.count(b'\n') + (bool(data) and not data.endswith(b'\n')),
+        'mtime': stat.st_mtime,
+    }, data
+
+
+def build(test_case_id):
+    """Describe every case of ``test_case_id`` and save it as manifest.json.
+
+    Files unchanged since the previous manifest are not read again.
+    """
+    data_dir = settings.TEST_DATA_ROOT / str(test_case_id)
+    old = _read(test_case_id) or {}
+    manifest = {}
+    for file in sorted(data_dir.glob('*')):
+        if file.suffix not in ('.in', '.ans'):
+            continue
+        kind = file.suffix[1:]
+        case = manifest.setdefault(file.stem, {'in': None, 'ans': None})
+        stat = file.stat()
+        previous = old.get(file.stem, {}).get(kind)
+        if previous and previous['size'] == stat.st_size and previous[
+                'mtime'] == stat.st_mtime:
+            case[kind] = previous
+            continue
+        case[kind], data = _describe(file)
+        if kind == 'ans':
+            case[kind]['md5'] = normalized_md5(data)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    (data_dir / 'manifest.json').write_text(json.dumps(manifest),
+                                            encoding='utf-8')
+    cache.set(f'test_case_manifest_{test_case_id}', manifest, None)
+    return manifest
+
+
+def _read(test_case_id):
+    manifest = cache.get(f'test_case_manifest_{test_case_id}')
+    if manifest is not None:
+        return manifest
+    file = settings.TEST_DATA_ROOT / str(test_case_id) / 'manifest.json'
+    if not file.is_file():
+        return None
+    manifest = json.loads(file.read_text(encoding='utf-8'))
+    cache.set(f'test_case_manifest_{test_case_id}', manifest, None)
+    return manifest
+
+
+def load(test_case_id):
+    manifest = _read(test_case_id)
+    if manifest is None:
+        # Test data uploaded before manifests existed.
+        if not (settings.TEST_DATA_ROOT / str(test_case_id)).is_dir():
+            return {}
+        manifest = build(test_case_id)
+    return manifest
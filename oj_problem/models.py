@@ -1,7 +1,6 @@
 from uuid import uuid1
 
 from django.db import models
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from oj_user.models import User
 
@@ -10,6 +9,27 @@ def get_default_sample():
     return {'input': '', 'output': ''}
 
 
+def _flag(condition):
+    return models.ExpressionWrapper(condition,
+                                    output_field=models.BooleanField())
+
+
+class ProblemQuerySet(models.QuerySet):
+
+    def with_visibility(self):
+        """Annotate what the visibility properties need, no per-row query."""
+        from oj_contest import running
+
+        problem_ids = running.problem_ids()
+        return self.annotate(
+            # An empty ``__in`` would make Django drop every row.
+            in_running_contest=_flag(models.Q(id__in=problem_ids))
+            if problem_ids else models.Value(
+                False, output_field=models.BooleanField()),
+            has_test_cases=_flag(~models.Q(test_case__test_case_config=[])),
+        )
+
+
 class Problem(models.Model):
     title = models.CharField(_('title'), max_length=50)
     background = models.TextField(_('background'), blank=True, default='')
@@ -44,21 +64,32 @@ class Problem(models.Model):
     accepted_count = models.IntegerField(_('solved count'), default=0)
     files = models.JSONField(_('problem files'), default=list)
 
+    objects = ProblemQuerySet.as_manager()
+
     @property
     def is_hidden(self):
         return any([
             self._is_hidden,
         ])
 
+    def _in_running_contest(self):
+        if hasattr(self, 'in_running_contest'):
+            return self.in_running_contest
+        from oj_contest import running
+
+        return self.id in running.problem_ids()
+
+    def _has_test_cases(self):
+        if hasattr(self, 'has_test_cases'):
+            return bool(self.has_test_cases)
+        return bool(len(self.test_case.test_case_config))
+
     @property
     def hide_submissions(self):
         return any([
             self.is_hidden,
             self._hide_submissions,
-            self.contests.filter(
-                contest__start_time__lt=timezone.now(),
-                contest__end_time__gt=timezone.now(),
-            ).exists(),
+            self._in_running_contest(),
         ])
 
     @property
@@ -66,17 +97,14 @@ class Problem(models.Model):
         return any([
             self.is_hidden,
             self._hide_discussions,
-            self.contests.filter(
-                contest__start_time__lt=timezone.now(),
-                contest__end_time__gt=timezone.now(),
-            ).exists(),
+            self._in_running_contest(),
         ])
 
     @property
     def allow_submit(self):
         return all([
             self._allow_submit,
-            bool(len(self.test_case.test_case_config)),
+            self._has_test_cases(),
         ])
 
     class Meta:
@@ -132,6 +160,7 @@ class TestCase(models.Model):
     use_subcheck = models.BooleanField(_('subcheck'), default=False)
     allow_download = models.BooleanField(_('allow download case data'),
                                          default=True)
+    update_time = models.DateTimeField(_('update time'), auto_now=True)
 
     class Meta:
         verbose_name = _('testcase')
@@ -0,0 +1,72 @@
+"""Problem list and detail responses shared between users.
+
+A response is cached per problem set version, visibility and URL, the
+``solved`` flags are filled in for each request afterwards.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from oj_contest import running
+from rest_framework.response import Response
+
+from . import solved
+
+VERSION_KEY = 'problem_set_version'
+
+
+def get_version():
+    """Time of the last problem set change, bumped by signals."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    cache.set(VERSION_KEY, time.time(), None)
+
+
+def _digest(value):
+    return hashlib.md5(
+        json.dumps(value, cls=DjangoJSONEncoder,
+                   sort_keys=True).encode()).hexdigest()
+
+
+def respond(request, visible_ids, build, many=False):
+    """Serve ``build()``'s response data from the cache when possible.
+
+    ``visible_ids`` are the hidden problems the user may see through
+    running contests, None for problem admins.
+    """
+    version = get_version()
+    key = 'problem_response_' + _digest([
+        version,
+        None if visible_ids is None else sorted(visible_ids),
+        # Hidden submissions and discussions follow the running contests.
+        sorted(running.problem_ids()),
+        request.build_absolute_uri(),
+    ])
+    data = cache.get(key)
+    if data is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        data = response.data
+        cache.set(key, data, settings.PROBLEM_RESPONSE_CACHE_TIMEOUT)
+    solved_ids = solved.for_request(request)
+    for item in data['results'] if many else [data]:
+        item['solved'] = item['id'] in solved_ids
+
+    # No Last-Modified, the response also changes with the visibility and
+    # the running contests, which have no modification time.
+    etag = f'"{_digest(data)}"'
+    headers = {'ETag': etag}
+    not_modified = etag in request.headers.get('If-None-Match', '')
+    if not_modified:
+        return Response(status=304, headers=headers)
+    return Response(data, headers=headers)
@@ -0,0 +1,123 @@
+"""Full-text search over problem title, background, description and hint.
+
+PostgreSQL keeps a weighted ``tsvector`` in a generated column with a
+GIN index, SQLite an external content FTS5 table kept in sync by
+triggers. Both are created after ``migrate``, title substrings match
+too. Other databases fall back to ``icontains``.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+FIELDS = ['title', 'background', 'description', 'hint']
+WEIGHTS = ['A', 'B', 'C', 'D']
+
+TABLE = 'oj_problem_problem'
+FTS_TABLE = 'oj_problem_search'
+
+
+def _postgresql_install(cursor):
+    config = settings.PROBLEM_SEARCH_CONFIG
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{config}', coalesce({field}, '')), "
+        f"'{weight}')" for field, weight in zip(FIELDS, WEIGHTS))
+    cursor.execute(f'ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS '
+                   f'search_vector tsvector GENERATED ALWAYS AS ({vector}) '
+                   'STORED')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_search_idx '
+                   f'ON {TABLE} USING gin (search_vector)')
+
+
+def _sqlite_install(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s",
+                   [FTS_TABLE])
+    exists = cursor.fetchone() is not None
+    columns = ', '.join(FIELDS)
+    new = ', '.join(f'new.{i}' for i in FIELDS)
+    old = ', '.join(f'old.{i}' for i in FIELDS)
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+        f"{columns}, content='{TABLE}', content_rowid='id')")
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert '
+        f'AFTER INSERT ON {TABLE} BEGIN '
+        f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new}); '
+        'END')
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete '
+        f'AFTER DELETE ON {TABLE} BEGIN '
+        f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) '
+        f"VALUES ('delete', old.id, {old}); "
+        'END')
+    # Only text changes, the counters are updated all the time.
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update '
+        f'AFTER UPDATE OF {columns} ON {TABLE} BEGIN '
+        f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) '
+        f"VALUES ('delete', old.id, {old}); "
+        f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new}); '
+        'END')
+    if not exists:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def install(using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            _postgresql_install(cursor)
+        elif connection.vendor == 'sqlite':
+            _sqlite_install(cursor)
+
+
+def _fts5_query(text):
+    # Every word quoted, so user input is never parsed as FTS5 syntax.
+    return ' '.join('"%s"' % i.replace('"', '""') for i in text.split())
+
+
+def search(queryset, text):
+    """Problems of ``queryset`` matching ``text``, best matches first."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = f"plainto_tsquery('{settings.PROBLEM_SEARCH_CONFIG}', %s)"
+        matches = RawSQL(
+            f'SELECT id FROM {TABLE} WHERE search_vector @@ {tsquery}',
+            [text])
+        rank = RawSQL(f'ts_rank({TABLE}.search_vector, {tsquery})', [text])
+    elif vendor == 'sqlite':
+        query = _fts5_query(text)
+        matches = RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [query])
+        # bm25 is lower for better matches.
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 2.0, 1.0) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {TABLE}.id', [query])
+    else:
+        condition = Q()
+        for field in FIELDS:
+            condition |= Q(**{f'{field}__icontains': text})
+        return queryset.filter(condition)
+
+    # Words are not segmented in CJK text and only whole words match, a
+    # title substring still finds the problem as it always did.
+    in_title = Q(title__icontains=text)
+    condition = Q(id__in=matches) | in_title
+    exact = Value(0, output_field=IntegerField())
+    if text.isdigit():
+        # Searching a problem id still finds that problem first.
+        condition |= Q(id=int(text))
+        exact = Case(When(id=int(text), then=1),
+                     default=0,
+                     output_field=IntegerField())
+    return queryset.filter(condition).annotate(
+        search_exact=exact,
+        search_title=Case(When(in_title, then=1),
+                          default=0,
+                          output_field=IntegerField()),
+        search_rank=rank,
+    ).order_by('-search_exact', '-search_title',
+               F('search_rank').desc(nulls_last=True), 'id')
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from . import solved
 from .models import Problem, TestCase, Tags, ProblemSolve
 
 
@@ -61,11 +62,11 @@ class ProblemSolved(serializers.ReadOnlyField):
 
     def to_representation(self, value):
         request = self.context.get('request')
-        return value.filter(user=request.user).exists()
+        return value.id in solved.for_request(request)
 
 
 class ProblemSerializer(serializers.ModelSerializer):
-    solved = ProblemSolved(source='problem_solve')
+    solved = ProblemSolved(source='*')
 
     class Meta:
         model = Problem
@@ -117,7 +118,7 @@ class AllowSubmit(serializers.ReadOnlyField):
 
 class ProblemDetailSerializer(serializers.ModelSerializer):
     samples = SampleSerializer(source='*')
-    solved = ProblemSolved(source='problem_solve')
+    solved = ProblemSolved(source='*')
     tags = TagsField()
     allow_submit = serializers.BooleanField(read_only=True)
     hide_submissions = serializers.BooleanField(read_only=True)
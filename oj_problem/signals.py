@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save)
+from django.dispatch import receiver
+from oj_contest.models import ContestProblem
+
+from . import response_cache, search, solved
+from .models import Problem, ProblemSolve, Tags, TestCase
+
+
+@receiver(post_save, sender=ProblemSolve)
+@receiver(post_delete, sender=ProblemSolve)
+def clear_solved_problems(instance, **kwargs):
+    transaction.on_commit(lambda: solved.clear(instance.user_id))
+
+
+@receiver(post_save, sender=Problem)
+@receiver(post_delete, sender=Problem)
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+@receiver(post_save, sender=TestCase)
+@receiver(post_delete, sender=TestCase)
+@receiver(post_save, sender=ContestProblem)
+@receiver(post_delete, sender=ContestProblem)
+@receiver(m2m_changed, sender=Problem.tags.through)
+@receiver(m2m_changed, sender=ContestProblem)
+def bump_problem_set_version(**kwargs):
+    transaction.on_commit(response_cache.bump_version)
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    if sender.name == 'oj_problem':
+        search.install(using)
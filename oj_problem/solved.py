@@ -0,0 +1,32 @@
+"""Per-user sets of solved problem ids, cached until a solve changes."""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ProblemSolve
+
+
+def _key(user_id):
+    return f'solved_problems_{user_id}'
+
+
+def get(user_id):
+    if user_id is None:
+        return frozenset()
+    problem_ids = cache.get(_key(user_id))
+    if problem_ids is None:
+        problem_ids = frozenset(
+            ProblemSolve.objects.filter(user=user_id).values_list(
+                'problem_id', flat=True))
+        cache.set(_key(user_id), problem_ids, settings.SOLVED_CACHE_TIMEOUT)
+    return problem_ids
+
+
+def for_request(request):
+    """The set of the requesting user, loaded once per request."""
+    if not hasattr(request, '_solved_problems'):
+        request._solved_problems = get(request.user.id)
+    return request._solved_problems
+
+
+def clear(user_id):
+    cache.delete(_key(user_id))
@@ -0,0 +1,34 @@
+"""Problem ids of every tag, to intersect tag filters in memory.
+
+Each process loads the index once per problem set version, tag and
+problem changes bump the version through ``response_cache``.
+"""
+from . import response_cache
+from .models import Problem
+
+_local = {'version': None, 'index': None}
+
+
+def _load():
+    index = {}
+    for problem_id, tag_id in Problem.tags.through.objects.values_list(
+            'problem_id', 'tags_id').iterator():
+        index.setdefault(tag_id, set()).add(problem_id)
+    return {i: frozenset(j) for i, j in index.items()}
+
+
+def get_index():
+    """``{tag_id: frozenset(problem_id, ...)}``"""
+    version = response_cache.get_version()
+    if _local['version'] != version:
+        # Read the version first, a change while loading reloads again.
+        _local['index'] = _load()
+        _local['version'] = version
+    return _local['index']
+
+
+def problem_ids(tag_ids):
+    """Problems having every tag of ``tag_ids``."""
+    index = get_index()
+    sets = sorted((index.get(i, frozenset()) for i in tag_ids), key=len)
+    return sets[0].intersection(*sets[1:])
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+
+def spj_hash(source):
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def set_spj_status(spj_id, status, digest, log=''):
+    cache.set(f'spj_compile_{spj_id}', {
+        'status': status,
+        'hash': digest,
+        'log': log,
+    }, None)
+
+
+def get_spj_status(spj_id):
+    return cache.get(f'spj_compile_{spj_id}')
+
+
+@shared_task
+def compile_spj(spj_id, source):
+    """Compile a checker into SPJ_ROOT/<spj_id>/checker.
+
+    Binaries are cached under SPJ_ROOT/cache by source hash, so the same
+    checker source is compiled only once.
+    """
+    digest = spj_hash(source)
+    cache_dir = settings.SPJ_ROOT / 'cache'
+    binary = cache_dir / digest
+    if not binary.is_file():
+        cache_dir.mkdir(exist_ok=True)
+        with tempfile.TemporaryDirectory() as build_dir:
+            src = Path(build_dir) / 'checker.cpp'
+            exe = Path(build_dir) / 'checker'
+            src.write_text(source, encoding='utf-8')
+            command = [
+                i.format(src=src, exe=exe, include=settings.SPJ_ROOT)
+                for i in settings.SPJ_COMPILE_COMMAND
+            ]
+            try:
+                process = subprocess.run(
+                    command,
+                    capture_output=True,
+                    timeout=settings.SPJ_COMPILE_TIMEOUT,
+                )
+            except subprocess.TimeoutExpired:
+                set_spj_status(spj_id, 'error', digest, 'Compile timed out')
+                return
+            if process.returncode != 0:
+                set_spj_status(spj_id, 'error', digest,
+                               process.stderr.decode(errors='replace'))
+                return
+            shutil.move(str(exe), binary.with_suffix('.tmp'))
+            os.replace(binary.with_suffix('.tmp'), binary)
+    checker = settings.SPJ_ROOT / str(spj_id) / 'checker'
+    checker.parent.mkdir(exist_ok=True)
+    shutil.copy2(binary, checker.with_suffix('.tmp'))
+    os.replace(checker.with_suffix('.tmp'), checker)
+    (checker.parent / 'checker.hash').write_text(digest, encoding='utf-8')
+    set_spj_status(spj_id, 'success', digest)
@@ -1,11 +1,9 @@
-import hashlib
 from zipfile import ZipFile
 
 from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Q
 from django.http import HttpResponse, StreamingHttpResponse
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
@@ -14,19 +12,22 @@ from oj_backend.permissions import Granted, IsAuthenticatedAndReadOnly
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.mixins import RetrieveModelMixin
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.viewsets import (GenericViewSet, ModelViewSet,
                                      ReadOnlyModelViewSet)
 
-from .filters import ProblemFilter
-from .models import Problem, Tags, TestCase
+from . import manifest, response_cache
+from .filters import ProblemFilter, ProblemSearchFilter
+from .models import Problem, SpjModeChoices, Tags, TestCase
 from .serializers import (ProblemDetailSerializer, ProblemSerializer,
                           TagsSerializer, TestCaseDetailSerializer,
                           TestCaseUpdateSerializer)
-from oj_contest.models import Contest
+from .tasks import compile_spj, get_spj_status, set_spj_status, spj_hash
+from oj_contest import running
+from oj_contest.models import ContestUser
 
 
 def partly_read(file, length, file_size):
@@ -47,17 +48,27 @@ def file_iterator(file, chunk_size=512):
                 break
 
 
-def get_problem_queryset(request):
+def get_visible_ids(request):
+    """Hidden problems the user may see, None if they may see them all."""
     if 'problem' in request.user.permissions:
+        return None
+    if not hasattr(request, '_visible_problems'):
+        contest_ids = running.contest_ids()
+        processing_contest = ContestUser.objects.filter(
+            contest__in=contest_ids,
+            user=request.user.id).values_list(
+                'contest_id', flat=True) if contest_ids else []
+        request._visible_problems = running.problem_ids(processing_contest)
+    return request._visible_problems
+
+
+def get_problem_queryset(request):
+    visible_ids = get_visible_ids(request)
+    if visible_ids is None:
         queryset = Problem.objects
     else:
-        processing_contest = Contest.objects.filter(
-            start_time__lt=timezone.now(),
-            end_time__gt=timezone.now()).filter(users=request.user.id)
-        queryset = Problem.objects.exclude(
-            Q(_is_hidden=True)) | Problem.objects.filter(
-                Q(_is_hidden=True) & Q(contest__in=processing_contest))
-        queryset = queryset.distinct()
+        queryset = Problem.objects.filter(
+            Q(_is_hidden=False) | Q(id__in=visible_ids))
     return queryset
 
 
@@ -71,13 +82,16 @@ class ProblemViewSet(ModelViewSet):
     permission = 'problem'
     lookup_value_regex = r'\d+'
     pagination_class = ProblemPagination
-    filter_backends = [SearchFilter, OrderingFilter, DjangoFilterBackend]
-    search_fields = ['id', 'title']
+    filter_backends = [
+        ProblemSearchFilter, OrderingFilter, DjangoFilterBackend
+    ]
+    search_fields = ['id', 'title', 'background', 'description', 'hint']
     ordering_fields = ['id', 'title']
     filterset_class = ProblemFilter
 
     def get_queryset(self):
-        queryset = get_problem_queryset(self.request)
+        queryset = get_problem_queryset(
+            self.request).with_visibility().prefetch_related('tags')
         return queryset.order_by('id')
 
     def get_serializer_class(self):
@@ -85,6 +99,22 @@ class ProblemViewSet(ModelViewSet):
             return ProblemSerializer
         return ProblemDetailSerializer
 
+    def list(self, request, *args, **kwargs):
+        return response_cache.respond(
+            request,
+            get_visible_ids(request),
+            lambda: super(ProblemViewSet, self).list(request, *args, **kwargs),
+            many=True,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return response_cache.respond(
+            request,
+            get_visible_ids(request),
+            lambda: super(ProblemViewSet, self).retrieve(
+                request, *args, **kwargs),
+        )
+
     @action(detail=True,
             methods=['get', 'delete'],
             url_path='file/(?P<file_name>.+)')
@@ -137,17 +167,34 @@ class DataViewSet(GenericViewSet, RetrieveModelMixin):
         length = 255 if partly else -1
         test_case_file = settings.TEST_DATA_ROOT / str(
             instance.test_case_id) / file
-        if not test_case_file.is_file():
+        kind = test_case_file.suffix[1:]
+        if kind in ('in', 'ans'):
+            case = manifest.load(instance.test_case_id).get(
+                test_case_file.stem, {})
+            if not case.get(kind):
+                raise NotFound(_('File not found.'))
+            file_size = case[kind]['size']
+        elif test_case_file.is_file():
+            file_size = test_case_file.stat().st_size
+        else:
             raise NotFound(_('File not found.'))
         response = HttpResponse(
             partly_read(
                 test_case_file,
                 length,
-                test_case_file.stat().st_size,
+                file_size,
             ))
         response['Content-Type'] = 'text/plain'
         return response
 
+    @action(methods=['get'], detail=True, url_path='spj')
+    def spj_status(self, request, *args, **kwargs):
+        instance = self.get_object()
+        data = get_spj_status(instance.spj_id)
+        if data is None:
+            raise NotFound(_('No checker has been compiled.'))
+        return Response(data)
+
     @swagger_auto_schema(
         responses={
             status.HTTP_200_OK:
@@ -174,20 +221,29 @@ class DataViewSet(GenericViewSet, RetrieveModelMixin):
             for file in test_cases.namelist():
                 file_name, file_ext = file.rsplit('.', 1)
                 if file_ext == 'ans':
-                    file_data = test_cases.read(file)
-                    file_data = b'\n'.join(
-                        map(bytes.rstrip,
-                            file_data.rstrip().splitlines()))
-                    file_hash = hashlib.md5(file_data).hexdigest()
+                    file_hash = manifest.normalized_md5(
+                        test_cases.read(file))
                     (data_dir / f'{file_name}.md5').write_text(
                         file_hash, encoding='utf-8')
+        if delete_cases or test_cases_file:
+            manifest.build(instance.test_case_id)
         use_spj = serializer.validated_data.get('use_spj')
         if use_spj:
             spj_source = serializer.validated_data.get('spj_source')
             spj_dir = settings.SPJ_ROOT / str(instance.spj_id)
             spj_dir.mkdir(exist_ok=True)
-            (spj_dir / 'checker').unlink(missing_ok=True)
             (spj_dir / 'checker.cpp').write_text(spj_source, encoding='utf-8')
+            digest = spj_hash(spj_source)
+            hash_file = spj_dir / 'checker.hash'
+            if not ((spj_dir / 'checker').is_file() and hash_file.is_file()
+                    and hash_file.read_text(encoding='utf-8') == digest):
+                (spj_dir / 'checker').unlink(missing_ok=True)
+                hash_file.unlink(missing_ok=True)
+                if serializer.validated_data.get(
+                        'spj_mode',
+                        instance.spj_mode) == SpjModeChoices.TRADITIONAL:
+                    set_spj_status(instance.spj_id, 'compiling', digest)
+                    compile_spj.delay(str(instance.spj_id), spj_source)
         serializer.save()
         serializer = TestCaseDetailSerializer(serializer.data)
         return Response(serializer.data)
@@ -1,14 +1,37 @@
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.core.cache import cache
+
+from .models import Submission
 
 
 class SubmissionConsumer(AsyncJsonWebsocketConsumer):
     room_name = None
     room_group_name = None
 
+    @database_sync_to_async
+    def can_view(self, user):
+        if user.is_anonymous:
+            return False
+        submission = Submission.objects.filter(
+            id=self.room_name).with_visibility().first()
+        if submission is None:
+            return False
+        if submission.user_id == user.id or 'submission' in user.permissions:
+            return True
+        site_settings = cache.get('site_settings') or {}
+        if site_settings.get('forceHideSubmissions'):
+            return False
+        return not submission.is_hidden
+
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['submission_id']
         self.room_group_name = 'submission_%s' % self.room_name
 
+        if not await self.can_view(self.scope['user']):
+            await self.close()
+            return
+
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -24,3 +47,6 @@ class SubmissionConsumer(AsyncJsonWebsocketConsumer):
 
     async def receive_json(self, content, **kwargs):
         print(content)
+
+    async def judge_message(self, event):
+        await self.send_json(event['message'])
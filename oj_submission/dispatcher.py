@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+class JudgeDispatcher(object):
+    """Picks the judge node for a task.
+
+    In-flight counts, latency and health of every node live in the cache so
+    that all workers share the same view of the cluster.
+    """
+
+    def __init__(self, nodes=None):
+        self.nodes = nodes or settings.JUDGE_SERVERS
+
+    @staticmethod
+    def key(kind, node):
+        return f'judge_node_{kind}_{node["server"]}'
+
+    def stats(self):
+        keys = [
+            self.key(kind, node) for node in self.nodes
+            for kind in ('inflight', 'latency', 'down')
+        ]
+        values = cache.get_many(keys)
+        return [{
+            **node,
+            'inflight': max(values.get(self.key('inflight', node), 0), 0),
+            'latency': values.get(self.key('latency', node), 0),
+            'down': bool(values.get(self.key('down', node))),
+        } for node in self.nodes]
+
+    def choose(self):
+        nodes = self.stats()
+        healthy = [i for i in nodes if not i['down']]
+        # When every node is drained, keep trying them rather than failing.
+        nodes = healthy or nodes
+        return min(
+            nodes,
+            key=lambda x: (
+                x['inflight'] >= x['capacity'],
+                x['inflight'] / (x['capacity'] * x['weight']),
+                x['latency'],
+            ),
+        )
+
+    def start(self, node):
+        # Expires once the node has been idle for a while, so counts left
+        # by killed workers do not keep it looking busy forever.
+        key = self.key('inflight', node)
+        timeout = settings.JUDGE_INFLIGHT_TIMEOUT
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout)
+        else:
+            cache.touch(key, timeout)
+
+    def finish(self, node, elapsed=None):
+        key = self.key('inflight', node)
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+        if elapsed is not None:
+            key = self.key('latency', node)
+            latency = cache.get(key)
+            elapsed *= 1000
+            latency = elapsed if latency is None else latency * 0.8 + elapsed * 0.2
+            cache.set(key, latency, None)
+
+    def fail(self, node):
+        cache.set(self.key('down', node), True,
+                  settings.JUDGE_NODE_DRAIN_TIME)
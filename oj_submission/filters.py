@@ -0,0 +1,28 @@
+from django_filters import rest_framework as filters
+
+from oj_contest.models import Contest
+
+from .models import Submission
+
+
+class RejudgeFilter(filters.FilterSet):
+    problem = filters.NumberFilter(field_name='problem__id')
+    contest = filters.NumberFilter(method='filter_by_contest')
+    start_time = filters.IsoDateTimeFilter(field_name='create_time',
+                                           lookup_expr='gte')
+    end_time = filters.IsoDateTimeFilter(field_name='create_time',
+                                         lookup_expr='lte')
+
+    class Meta:
+        model = Submission
+        fields = ['status', 'language']
+
+    def filter_by_contest(self, queryset, name, value):
+        contest = Contest.objects.filter(id=value).first()
+        if contest is None:
+            return queryset.none()
+        return queryset.filter(
+            problem__in=contest.problems.all(),
+            user__in=contest.users.all(),
+            create_time__range=(contest.start_time, contest.end_time),
+        )
@@ -1,11 +1,17 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from django.conf import settings
 import json
-import base64
-from pathlib import Path
-from websocket import create_connection
+import os
+import queue
+import select
+import time
+from websocket import create_connection, WebSocketException
 import enum
 
+from .dispatcher import JudgeDispatcher
 from .models import StatusChoices
+from .storage import OutputStore
 
 
 class JudgeResult(enum.IntEnum):
@@ -29,10 +35,104 @@ ResultMapping = {
 }
 
 
+class JudgeConnectionPool(object):
+    """Keeps judge server websockets open and reuses them between tasks.
+
+    Pools are per worker process, see ``get_pool``.
+    """
+
+    def __init__(self, url, size, ping_interval):
+        self.url = url
+        self.size = size
+        self.ping_interval = ping_interval
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+
+    def connect(self):
+        connection = create_connection(self.url)
+        connection.last_used = time.monotonic()
+        return connection
+
+    def acquire(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return self.connect()
+            if self.is_alive(connection):
+                return connection
+            self.discard(connection)
+
+    def release(self, connection):
+        if not connection.connected or self._idle.qsize() >= self.size:
+            self.discard(connection)
+            return
+        connection.last_used = time.monotonic()
+        self._idle.put(connection)
+
+    @staticmethod
+    def discard(connection):
+        try:
+            connection.close(timeout=0)
+        except (WebSocketException, OSError):
+            pass
+
+    def is_alive(self, connection):
+        if not connection.connected:
+            return False
+        try:
+            # An idle socket should never be readable: anything there is
+            # either EOF from the server or a stale frame of an old task.
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+            if readable:
+                return False
+            if time.monotonic() - connection.last_used > self.ping_interval:
+                connection.ping()
+        except (WebSocketException, OSError, ValueError):
+            return False
+        return True
+
+    def clear(self):
+        while True:
+            try:
+                self.discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pools = {}
+
+
+def get_pool(url):
+    pool = _pools.get(url)
+    if pool is None or pool.pid != os.getpid():
+        # Never share sockets with a forked parent or sibling process.
+        pool = _pools[url] = JudgeConnectionPool(
+            url, settings.JUDGE_POOL_SIZE, settings.JUDGE_PING_INTERVAL)
+    return pool
+
+
 class JudgeClient(object):
 
-    def __init__(self):
-        self.client = create_connection(f'ws://{settings.JUDGE_SERVER}/')
+    def __init__(self, dispatcher=None):
+        self.dispatcher = dispatcher or JudgeDispatcher()
+        self.client = None
+        self.channel_layer = get_channel_layer()
+
+    def publish(self, task_id, data):
+        if self.channel_layer is None:
+            return
+        if data['type'] == 'part':
+            data = {i: j for i, j in data.items() if i != 'output'}
+        try:
+            async_to_sync(self.channel_layer.group_send)(
+                f'submission_{task_id}', {
+                    'type': 'judge.message',
+                    'message': data,
+                })
+        except OSError:
+            # Progress push is best effort, judging must go on without it.
+            pass
 
     def recv(self):
         try:
@@ -63,19 +163,44 @@ class JudgeClient(object):
             'code': code,
             'limit': limit
         }
+        for retry in (True, False):
+            node = self.dispatcher.choose()
+            pool = get_pool(f'ws://{node["server"]}/')
+            self.dispatcher.start(node)
+            start = time.monotonic()
+            elapsed = None
+            self.client = None
+            try:
+                self.client = pool.acquire()
+                outputs = OutputStore(task_id)
+                result = self.run(task_id, task_data, outputs)
+                elapsed = time.monotonic() - start
+            except (WebSocketException, OSError):
+                # Drain the node for a while and retry once elsewhere.
+                self.dispatcher.fail(node)
+                if self.client is not None:
+                    pool.discard(self.client)
+                if not retry:
+                    raise
+                continue
+            except Exception:
+                # The socket may be mid-task, never hand it out again.
+                if self.client is not None:
+                    pool.discard(self.client)
+                raise
+            finally:
+                self.dispatcher.finish(node, elapsed)
+            pool.release(self.client)
+            outputs.wait()
+            return result
+
+    def run(self, task_id, task_data, outputs):
         self.client.send(json.dumps(task_data))
-        detail_path = Path(f'{settings.SUBMISSION_ROOT}/{task_id}')
         while True:
             result = self.recv()
-            if result['type'] == 'compile':
-                # print(f'Compile log: {result["data"]}')
-                detail_path.mkdir(exist_ok=True)
-            elif result['type'] == 'part':
-                detail_file = detail_path / f'{result["test_case"]}.out'
-                output = base64.b64decode(result['output'])
-                detail_file.write_bytes(output)
-                # print(f'{result["test_case"]}: {output}')
+            self.publish(task_id, result)
+            if result['type'] == 'part':
+                outputs.write(result['test_case'], result['output'])
             elif result['type'] == 'final':
                 break
-        self.client.close()
         return result
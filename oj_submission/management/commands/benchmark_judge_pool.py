@@ -0,0 +1,166 @@
+import base64
+import hashlib
+import json
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from oj_submission.dispatcher import JudgeDispatcher
+from oj_submission.judger import JudgeClient, JudgeResult
+from oj_submission.storage import OutputStore
+from websocket import create_connection
+
+GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+RESPONSES = [
+    {
+        'type': 'compile',
+        'data': ''
+    },
+    {
+        'type': 'part',
+        'test_case': '1',
+        'output': base64.b64encode(b'42\n').decode()
+    },
+    {
+        'type': 'final',
+        'status': JudgeResult.ACCEPTED,
+        'score': 100,
+        'statistics': {
+            'max_time': 1,
+            'max_memory': 1
+        },
+        'log': '',
+        'detail': []
+    },
+]
+TASK = ('case', None, [], None, 'cpp', 'int main() {}', {})
+
+
+class StandInJudge(socketserver.StreamRequestHandler):
+    """Answers every task with compile, part and final right away."""
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        key = ''
+        while True:
+            line = self.rfile.readline()
+            if line in (b'', b'\r\n'):
+                break
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'sec-websocket-key':
+                key = value.strip()
+        accept = base64.b64encode(
+            hashlib.sha1((key + GUID).encode()).digest()).decode()
+        self.wfile.write(('HTTP/1.1 101 Switching Protocols\r\n'
+                          'Upgrade: websocket\r\n'
+                          'Connection: Upgrade\r\n'
+                          f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            opcode, payload = frame
+            if opcode == 0x8:
+                self.wfile.write(self.frame(0x8, payload[:2]))
+                return
+            elif opcode == 0x9:
+                self.wfile.write(self.frame(0xa, payload))
+            elif opcode == 0x1:
+                self.wfile.write(b''.join(
+                    self.frame(0x1,
+                               json.dumps(i).encode()) for i in RESPONSES))
+
+    def read_frame(self):
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            return None
+        length = head[1] & 0x7f
+        if length == 126:
+            length, = struct.unpack('!H', self.rfile.read(2))
+        elif length == 127:
+            length, = struct.unpack('!Q', self.rfile.read(8))
+        mask = self.rfile.read(4) if head[1] & 0x80 else bytes(4)
+        data = self.rfile.read(length)
+        data = bytes(j ^ mask[i % 4] for i, j in enumerate(data))
+        return head[0] & 0xf, data
+
+    @staticmethod
+    def frame(opcode, payload):
+        length = len(payload)
+        if length < 126:
+            head = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 65536:
+            head = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            head = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        return head + payload
+
+
+class Command(BaseCommand):
+    help = ('Compare pooled and fresh judge server connections, against a '
+            'stand-in judge unless --server is given')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=500)
+        parser.add_argument('--server', help='host:port of a judge server')
+
+    def handle(self, *args, **options):
+        server = options['server']
+        stand_in = None
+        if server is None:
+            stand_in = socketserver.ThreadingTCPServer(('127.0.0.1', 0),
+                                                       StandInJudge)
+            stand_in.daemon_threads = True
+            threading.Thread(target=stand_in.serve_forever,
+                             daemon=True).start()
+            server = '%s:%s' % stand_in.server_address
+        try:
+            with tempfile.TemporaryDirectory() as root, override_settings(
+                    SUBMISSION_ROOT=Path(root)):
+                fresh = self.measure_fresh(server, options['tasks'])
+                pooled = self.measure_pooled(server, options['tasks'])
+        finally:
+            if stand_in is not None:
+                stand_in.shutdown()
+                stand_in.server_close()
+        self.stdout.write(f'fresh connection: {fresh * 1000:.2f} ms/task')
+        self.stdout.write(f'pooled connection: {pooled * 1000:.2f} ms/task')
+
+    @staticmethod
+    def client(server):
+        client = JudgeClient(
+            JudgeDispatcher([{
+                'server': server,
+                'weight': 1,
+                'capacity': 1
+            }]))
+        # Time the judge connection only, not progress pushes.
+        client.channel_layer = None
+        return client
+
+    def measure_fresh(self, server, tasks):
+        client = self.client(server)
+        start = time.monotonic()
+        for i in range(tasks):
+            client.client = create_connection(f'ws://{server}/')
+            outputs = OutputStore(i)
+            client.run(i, {'task_id': str(i)}, outputs)
+            client.client.close()
+            outputs.wait()
+        return (time.monotonic() - start) / tasks
+
+    def measure_pooled(self, server, tasks):
+        client = self.client(server)
+        start = time.monotonic()
+        for i in range(tasks):
+            client.judge(i, *TASK)
+        return (time.monotonic() - start) / tasks
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -24,6 +25,22 @@ class StatusChoices(models.IntegerChoices):
     SYSTEM_ERROR = 4, _('system error')
 
 
+class SubmissionQuerySet(models.QuerySet):
+
+    def with_visibility(self):
+        """Load what ``is_hidden`` needs in the same query."""
+        from oj_contest import running
+
+        hidden = Q(problem___is_hidden=True) | Q(
+            problem___hide_submissions=True)
+        problem_ids = running.problem_ids()
+        if problem_ids:
+            hidden |= Q(problem__in=problem_ids)
+        return self.select_related('user', 'problem').annotate(
+            problem_hidden=ExpressionWrapper(hidden,
+                                             output_field=BooleanField()))
+
+
 class Submission(models.Model):
     user = models.ForeignKey(
         User,
@@ -62,8 +79,12 @@ class Submission(models.Model):
     _is_hidden = models.BooleanField(_('hidden'), default=False)
     allow_download = models.BooleanField(_('allow download'), default=True)
 
+    objects = SubmissionQuerySet.as_manager()
+
     @property
     def is_hidden(self):
+        if hasattr(self, 'problem_hidden'):
+            return self._is_hidden or self.problem_hidden
         return any([
             self._is_hidden,
             self.problem.hide_submissions,
@@ -72,3 +93,4 @@ class Submission(models.Model):
     class Meta:
         verbose_name = _('submission')
         verbose_name_plural = _('submissions')
+        indexes = [models.Index(fields=['user', 'problem', 'create_time'])]
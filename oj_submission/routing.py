@@ -3,5 +3,5 @@ from django.urls import re_path
 from .consumers import SubmissionConsumer
 
 websocket_urlpatterns = [
-    re_path(r'ws/submission/(?P<submission_id>\w+)/', SubmissionConsumer.as_asgi()),
+    re_path(r'ws/submission/(?P<submission_id>\d+)/', SubmissionConsumer.as_asgi()),
 ]
@@ -1,14 +1,16 @@
 from django.core.cache import cache
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from oj_problem import counters
 from oj_problem.models import Problem
 from oj_problem.serializers import ProblemBriefSerializer
 from oj_problem.views import get_problem_queryset
+from oj_user import stats
 from oj_user.serializers import UserBriefSerializer
 from rest_framework import serializers
 
 from .models import Submission
-from .tasks import judge
+from .tasks import judge_submission, reuse_verdict
 
 
 class SubmissionSerializer(serializers.ModelSerializer):
@@ -42,19 +44,12 @@ class SubmissionDetailSerializer(serializers.ModelSerializer):
                 _('Problem submit is not allowed'))
         validated_data['problem'] = problem
         submission = Submission.objects.create(**validated_data)
-        judge.delay(
-            submission.id, submission.problem.test_case.test_case_id,
-            submission.problem.test_case.spj_id
-            if submission.problem.test_case.use_spj else None,
-            submission.problem.test_case.test_case_config,
-            submission.problem.test_case.subcheck_config
-            if submission.problem.test_case.use_subcheck else None,
-            submission.language, submission.source, {
-                'max_cpu_time': submission.problem.time_limit,
-                'max_memory': submission.problem.memory_limit * 1024 * 1024,
-            })
-        problem.submission_count += 1
-        problem.save(update_fields=['submission_count'])
+        stats.incr(user.id,
+                   submissions=1,
+                   languages={submission.language: 1})
+        if not reuse_verdict(submission):
+            judge_submission(submission)
+        counters.incr(problem.id, 'submission_count')
         return submission
 
     class Meta:
@@ -0,0 +1,104 @@
+import base64
+import gzip
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+_executor = ThreadPoolExecutor(max_workers=2,
+                               thread_name_prefix='submission-output')
+
+
+def output_dir(submission_id):
+    return settings.SUBMISSION_ROOT / str(submission_id)
+
+
+def truncate(data):
+    head = settings.SUBMISSION_OUTPUT_HEAD
+    tail = settings.SUBMISSION_OUTPUT_TAIL
+    if len(data) <= head + tail:
+        return data
+    skipped = len(data) - head - tail
+    marker = f'\n... {skipped} bytes omitted ...\n'.encode()
+    return data[:head] + marker + data[len(data) - tail:]
+
+
+class OutputStore(object):
+    """Writes the outputs of one submission as ``<case>.out.gz``.
+
+    Decoding, truncation and compression run on a thread pool so the judge
+    receive loop never blocks on disk, call ``wait`` before reporting.
+    """
+
+    def __init__(self, submission_id):
+        self.path = output_dir(submission_id)
+        self.futures = []
+
+    def write(self, name, output):
+        self.futures.append(_executor.submit(self._write, name, output))
+
+    def _write(self, name, output):
+        data = truncate(base64.b64decode(output))
+        self.path.mkdir(parents=True, exist_ok=True)
+        path = self.path / f'{name}.out.gz'
+        temp = path.with_suffix('.tmp')
+        # Replace instead of truncating, the file may be hard linked from
+        # another submission by ``copy_outputs``.
+        with gzip.open(temp, 'wb', compresslevel=6) as f:
+            f.write(data)
+        os.replace(temp, path)
+
+    def wait(self):
+        futures, self.futures = self.futures, []
+        for future in wait(futures).done:
+            future.result()
+
+
+def copy_outputs(source_id, target_id):
+    source, target = output_dir(source_id), output_dir(target_id)
+    if source.is_dir():
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(source, target, copy_function=os.link)
+
+
+def open_output(submission_id, name):
+    path = output_dir(submission_id)
+    if (path / f'{name}.out.gz').is_file():
+        return gzip.open(path / f'{name}.out.gz', 'rt', encoding='utf-8',
+                         errors='replace')
+    elif (path / f'{name}.out').is_file():
+        # Outputs written before compression was introduced.
+        return open(path / f'{name}.out', 'r', encoding='utf-8',
+                    errors='replace')
+    return None
+
+
+def read_output(submission_id, name, length=-1):
+    f = open_output(submission_id, name)
+    if f is None:
+        return None
+    with f:
+        if length < 0:
+            return f.read()
+        content = f.read(length + 1)
+    if len(content) > length:
+        content = content[:length] + '...'
+    return content
+
+
+def output_iterator(submission_id, name, chunk_size=512):
+    f = open_output(submission_id, name)
+    if f is None:
+        return None
+    return _file_iterator(f, chunk_size)
+
+
+def _file_iterator(f, chunk_size):
+    with f:
+        while True:
+            c = f.read(chunk_size)
+            if c:
+                yield c
+            else:
+                break
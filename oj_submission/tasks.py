@@ -1,12 +1,81 @@
+import time
+
 from celery import shared_task
-from .judger import JudgeClient, ResultMapping
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from . import verdicts
+from .judger import JudgeClient, JudgeResult, ResultMapping
 from .models import Submission, StatusChoices
+from .storage import copy_outputs
+from oj_contest import ranking, running, statistics
+from oj_contest.models import ContestUser
+from oj_problem import counters
 from oj_problem.models import ProblemSolve
+from oj_user import stats
+
+
+def get_judge_queue(submission):
+    contest_ids = [
+        i for i, j in running.get_running().items()
+        if submission.problem_id in j
+    ]
+    if contest_ids and ContestUser.objects.filter(
+            contest__in=contest_ids, user=submission.user_id).exists():
+        return 'contest'
+    return 'practice'
+
+
+def judge_submission(submission, queue=None, rejudge_job=None):
+    test_case = submission.problem.test_case
+    judge.apply_async(
+        (
+            submission.id,
+            test_case.test_case_id,
+            test_case.spj_id if test_case.use_spj else None,
+            test_case.test_case_config,
+            test_case.subcheck_config if test_case.use_subcheck else None,
+            submission.language,
+            submission.source,
+            {
+                'max_cpu_time': submission.problem.time_limit,
+                'max_memory': submission.problem.memory_limit * 1024 * 1024,
+            },
+        ),
+        {
+            'rejudge_job': rejudge_job,
+            'verdict_key': verdicts.get_key(submission),
+        },
+        **settings.JUDGE_QUEUES[queue or get_judge_queue(submission)],
+    )
 
 
 @shared_task
-def judge(task_id, case_id, spj_id, test_case_config, subcheck_config, lang,
-          code, limit):
+def judge(task_id,
+          case_id,
+          spj_id,
+          test_case_config,
+          subcheck_config,
+          lang,
+          code,
+          limit,
+          rejudge_job=None,
+          verdict_key=None):
+    try:
+        _judge(task_id, case_id, spj_id, test_case_config, subcheck_config,
+               lang, code, limit, rejudge_job, verdict_key)
+    finally:
+        if rejudge_job is not None:
+            # The progress keys may have expired, never hide the real error.
+            key = f'rejudge_{rejudge_job}_finished'
+            cache.add(key, 0, settings.REJUDGE_PROGRESS_TIMEOUT)
+            cache.incr(key)
+            cache.set(f'rejudge_{rejudge_job}_active', time.time(),
+                      settings.REJUDGE_PROGRESS_TIMEOUT)
+
+
+def _judge(task_id, case_id, spj_id, test_case_config, subcheck_config, lang,
+           code, limit, rejudge_job, verdict_key):
     submission = Submission.objects.get(id=task_id)
     judger = JudgeClient()
     submission.status = StatusChoices.JUDGING
@@ -14,6 +83,23 @@ def judge(task_id, case_id, spj_id, test_case_config, subcheck_config, lang,
     submission.save(update_fields=['status', 'allow_download'])
     result = judger.judge(task_id, case_id, spj_id, test_case_config,
                           subcheck_config, lang, code, limit)
+    if verdict_key and result['status'] != JudgeResult.SYSTEM_ERROR:
+        verdicts.save(verdict_key, task_id, result)
+    finish_submission(submission, result, rejudge_job)
+
+
+def reuse_verdict(submission):
+    """Complete ``submission`` from the verdict of an identical one."""
+    cached = verdicts.load(verdicts.get_key(submission))
+    if cached is None:
+        return False
+    copy_outputs(cached['submission_id'], submission.id)
+    submission.allow_download = submission.problem.test_case.allow_download
+    finish_submission(submission, cached)
+    return True
+
+
+def finish_submission(submission, result, rejudge_job=None):
     submission.status = ResultMapping[result['status']]
     submission.score = result['score']
     submission.execute_time = result['statistics']['max_time']
@@ -21,10 +107,111 @@ def judge(task_id, case_id, spj_id, test_case_config, subcheck_config, lang,
     submission.detail = result['detail']
     submission.log = result['log']
     submission.save(update_fields=[
-        'status', 'score', 'execute_time', 'execute_memory', 'detail', 'log'
+        'status', 'score', 'execute_time', 'execute_memory', 'detail', 'log',
+        'allow_download'
     ])
+    solved = 0
     if submission.status == StatusChoices.ACCEPTED:
-        submission.problem.accepted_count += 1
-        submission.problem.save(update_fields=['accepted_count'])
-        ProblemSolve.objects.get_or_create(user=submission.user,
-                                           problem=submission.problem)
+        counters.incr(submission.problem_id, 'accepted_count')
+        _, created = ProblemSolve.objects.get_or_create(
+            user=submission.user, problem=submission.problem)
+        solved = int(created)
+    elif rejudge_job is not None and not Submission.objects.filter(
+            user=submission.user_id,
+            problem=submission.problem_id,
+            status=StatusChoices.ACCEPTED,
+    ).exists():
+        deleted, _ = ProblemSolve.objects.filter(
+            user=submission.user_id,
+            problem=submission.problem_id).delete()
+        solved = -deleted
+    stats.incr(submission.user_id,
+               accepted=int(submission.status == StatusChoices.ACCEPTED),
+               solved=solved,
+               statuses={submission.status: 1})
+    for contest in ranking.update(submission):
+        statistics.update(contest, submission, rejudge_job is not None)
+        ranking.publish(contest, [submission.user_id])
+
+
+def get_rejudge_progress(job_id):
+    keys = [
+        f'rejudge_{job_id}_{i}'
+        for i in ('total', 'dispatched', 'finished', 'lost', 'active')
+    ]
+    values = cache.get_many(keys)
+    if keys[0] not in values:
+        return None
+    dispatched = values.get(keys[1], 0)
+    finished = values.get(keys[2], 0)
+    stalled = values.get(keys[3], 0)  # given up on by earlier batches
+    pending = dispatched - finished - stalled
+    # Nothing finished since long after the batch was dispatched, the judge
+    # messages of the rest are probably lost.
+    if pending > 0 and time.time() >= values.get(
+            keys[4], 0) + settings.JUDGE_INFLIGHT_TIMEOUT:
+        stalled += pending
+    return {
+        'total': values[keys[0]],
+        'dispatched': dispatched,
+        'finished': finished,
+        'stalled': stalled,
+    }
+
+
+def start_rejudge(job_id, submission_ids):
+    for key, value in [('total', len(submission_ids)), ('dispatched', 0),
+                       ('finished', 0), ('lost', 0)]:
+        cache.set(f'rejudge_{job_id}_{key}', value,
+                  settings.REJUDGE_PROGRESS_TIMEOUT)
+    rejudge.delay(job_id, submission_ids)
+
+
+@shared_task
+def rejudge(job_id, submission_ids):
+    """Reset and re-enqueue ``submission_ids`` one batch at a time."""
+    progress = get_rejudge_progress(job_id)
+    batch_size = settings.REJUDGE_BATCH_SIZE
+    if progress is not None and progress['dispatched'] > progress[
+            'finished'] + progress['stalled']:
+        # Wait until the last batch is judged completely.
+        rejudge.apply_async((job_id, submission_ids),
+                            countdown=settings.REJUDGE_BATCH_INTERVAL)
+        return
+    elif progress is not None:
+        # Stop waiting for the stalled tasks in later batches.
+        cache.set(f'rejudge_{job_id}_lost', progress['stalled'],
+                  settings.REJUDGE_PROGRESS_TIMEOUT)
+    batch, submission_ids = (submission_ids[:batch_size],
+                             submission_ids[batch_size:])
+    submissions = Submission.objects.filter(id__in=batch)
+    accepted = submissions.filter(status=StatusChoices.ACCEPTED).values(
+        'problem_id').annotate(count=Count('id'))
+    for i in accepted:
+        counters.incr(i['problem_id'], 'accepted_count', -i['count'])
+    judged = {}
+    for i in submissions.exclude(status__in=stats.UNFINISHED).values(
+            'user_id', 'status').annotate(count=Count('id')):
+        judged.setdefault(i['user_id'], {})[i['status']] = -i['count']
+    submissions.update(status=StatusChoices.PENDING,
+                       score=0,
+                       execute_time=0,
+                       execute_memory=0,
+                       detail=[],
+                       log='')
+    for user_id, statuses in judged.items():
+        stats.incr(user_id,
+                   accepted=statuses.get(StatusChoices.ACCEPTED, 0),
+                   statuses=statuses)
+    submissions = list(submissions.select_related('problem__test_case'))
+    # Counted first, so a fast judge never gets ahead of dispatched.
+    cache.set(f'rejudge_{job_id}_active', time.time(),
+              settings.REJUDGE_PROGRESS_TIMEOUT)
+    cache.add(f'rejudge_{job_id}_dispatched', 0,
+              settings.REJUDGE_PROGRESS_TIMEOUT)
+    cache.incr(f'rejudge_{job_id}_dispatched', len(submissions))
+    for submission in submissions:
+        judge_submission(submission, 'rejudge', rejudge_job=job_id)
+    if submission_ids:
+        rejudge.apply_async((job_id, submission_ids),
+                            countdown=settings.REJUDGE_BATCH_INTERVAL)
@@ -1,3 +1,66 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oj_contest.models import Contest, ContestProblem, ContestUser
+from oj_problem.models import Problem
+from oj_user.models import User
+from rest_framework.test import APIClient
+
+from .models import Submission
+
+
+class SubmissionListQueryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.user = User.objects.create(username='viewer')
+        users = [User.objects.create(username=f'user{i}') for i in range(5)]
+        problems = [Problem.objects.create(title=f'p{i}') for i in range(6)]
+        problems[0]._is_hidden = True
+        problems[0].save()
+        problems[1]._hide_submissions = True
+        problems[1].save()
+        contest = Contest.objects.create(title='running',
+                                         start_time=now - timedelta(hours=1),
+                                         end_time=now + timedelta(hours=1))
+        ContestProblem.objects.create(contest=contest, problem=problems[2])
+        ContestUser.objects.create(contest=contest, user=cls.user)
+        Submission.objects.bulk_create([
+            Submission(user=[cls.user, *users][i % 6],
+                       problem=problems[i % 6],
+                       source='',
+                       language='c') for i in range(150)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        cache.set('site_settings', {'forceHideSubmissions': False})
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        # The first request also loads the running contests into the cache.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        expected = self.count_queries('/submission/?limit=10')
+        with self.assertNumQueries(expected):
+            response = self.client.get('/submission/?limit=100')
+        self.assertEqual(len(response.data['results']), 100)
 
-# Create your tests here.
+    def test_admin_list_queries_do_not_grow_with_rows(self):
+        self.user.permissions = ['submission']
+        self.user.save()
+        expected = self.count_queries('/submission/?limit=10')
+        with self.assertNumQueries(expected):
+            response = self.client.get('/submission/?limit=100')
+        self.assertEqual(len(response.data['results']), 100)
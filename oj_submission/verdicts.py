@@ -0,0 +1,40 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def get_key(submission):
+    """Everything that can change the verdict of ``submission``."""
+    problem = submission.problem
+    test_case = problem.test_case
+    data = [
+        hashlib.sha256(submission.source.encode()).hexdigest(),
+        submission.language,
+        str(test_case.test_case_id),
+        test_case.update_time.isoformat(),
+        test_case.test_case_config,
+        problem.time_limit,
+        problem.memory_limit,
+        test_case.use_spj and [str(test_case.spj_id), test_case.spj_mode],
+        test_case.use_subcheck and test_case.subcheck_config,
+    ]
+    data = json.dumps(data, sort_keys=True).encode()
+    return f'verdict_{hashlib.sha256(data).hexdigest()}'
+
+
+def load(key):
+    return cache.get(key)
+
+
+def save(key, submission_id, result):
+    cache.set(
+        key, {
+            'submission_id': submission_id,
+            'status': result['status'],
+            'score': result['score'],
+            'statistics': result['statistics'],
+            'detail': result['detail'],
+            'log': result['log'],
+        }, settings.VERDICT_CACHE_TIMEOUT)
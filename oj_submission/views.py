@@ -1,22 +1,30 @@
+from uuid import uuid4
+
 from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Q
 from django.http import HttpResponse, StreamingHttpResponse
-from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
+from oj_backend.celery import app as celery_app
 from oj_backend.permissions import (Captcha, Granted,
                                     IsAuthenticatedAndReadCreate,
                                     IsAuthenticatedAndReadOnly)
-from oj_contest.models import Contest
+from oj_contest import running
+from oj_problem import manifest
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import OrderingFilter
 from rest_framework.mixins import CreateModelMixin
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from .filters import RejudgeFilter
 from .models import StatusChoices, Submission
 from .serializers import SubmissionDetailSerializer, SubmissionSerializer
+from .storage import output_iterator, read_output
+from .tasks import get_rejudge_progress, start_rejudge
 
 
 class SubmissionPagination(LimitOffsetPagination):
@@ -59,15 +67,12 @@ class SubmissionViewSet(ReadOnlyModelViewSet, CreateModelMixin):
         elif site_settings.get('forceHideSubmissions'):
             queryset = Submission.objects.filter(user=self.request.user)
         else:
-            processing_contest = Contest.objects.filter(
-                start_time__lt=timezone.now(), end_time__gt=timezone.now())
             queryset = Submission.objects.exclude(
                 Q(_is_hidden=True) | Q(problem___is_hidden=True)
                 | Q(problem___hide_submissions=True)
-                | Q(problem__contests__contest__in=processing_contest)
+                | Q(problem__in=running.problem_ids())
             ) | Submission.objects.filter(Q(user=self.request.user))
-            queryset = queryset.distinct()
-        return queryset.order_by('-id')
+        return queryset.with_visibility().order_by('-id')
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -82,6 +87,58 @@ class SubmissionViewSet(ReadOnlyModelViewSet, CreateModelMixin):
         submission = self.get_object()
         return Response({'status': submission.status})
 
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=[Granted],
+            url_path='queues')
+    def get_queues(self, request):
+        data = {}
+        with celery_app.connection_or_acquire() as connection:
+            for name, queue in settings.JUDGE_QUEUES.items():
+                channel = connection.channel()
+                try:
+                    _, messages, consumers = channel.queue_declare(
+                        queue['queue'], passive=True)
+                except connection.channel_errors:
+                    # The queue is only declared once a worker or task uses it.
+                    messages = consumers = 0
+                finally:
+                    channel.close()
+                data[name] = {
+                    'queue': queue['queue'],
+                    'messages': messages,
+                    'consumers': consumers,
+                }
+        return Response(data)
+
+    @action(detail=False,
+            methods=['post'],
+            permission_classes=[Granted],
+            url_path='rejudge')
+    def rejudge(self, request):
+        filterset = RejudgeFilter(request.data,
+                                  queryset=Submission.objects.all())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        if not any(i in request.data for i in filterset.filters):
+            raise ValidationError(_('At least one filter is required.'))
+        submission_ids = list(
+            filterset.qs.order_by('id').values_list('id', flat=True))
+        job_id = uuid4().hex
+        start_rejudge(job_id, submission_ids)
+        return Response({'job_id': job_id, 'total': len(submission_ids)},
+                        status=202)
+
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=[Granted],
+            url_path=r'rejudge/(?P<job_id>[0-9a-f]+)')
+    def rejudge_progress(self, request, job_id):
+        progress = get_rejudge_progress(job_id)
+        if progress is None:
+            raise NotFound(_('Rejudge job not found.'))
+        return Response(progress)
+
     @action(detail=True,
             methods=['get'],
             permission_classes=[IsAuthenticatedAndReadOnly],
@@ -105,22 +162,28 @@ class SubmissionViewSet(ReadOnlyModelViewSet, CreateModelMixin):
             instance.problem.test_case.test_case_id) / f'{name}.ans'
         in_file = settings.TEST_DATA_ROOT / str(
             instance.problem.test_case.test_case_id) / f'{name}.in'
-        out_file = settings.SUBMISSION_ROOT / str(instance.id) / f'{name}.out'
+        case = manifest.load(instance.problem.test_case.test_case_id).get(
+            name, {})
 
         if mode == 'fetch':
             length = -1
             file = self.request.query_params.get('file')
-            file = {'in': in_file, 'out': out_file, 'ans': ans_file}.get(file)
-            if file is None:
+            if file == 'out':
+                iterator = output_iterator(instance.id, name)
+            else:
+                file = {'in': in_file, 'ans': ans_file}.get(file)
+                iterator = file and file_iterator(file)
+            if iterator is None:
                 return HttpResponse('FILE NOT FOUND', status=404)
-            return StreamingHttpResponse(file_iterator(file))
+            return StreamingHttpResponse(iterator)
         else:
             length = 255
-            ans = _in = out = 'FILE NOT FOUND'
-            if ans_file.exists():
-                ans = partly_read(ans_file, length, ans_file.stat().st_size)
-            if in_file.exists():
-                _in = partly_read(in_file, length, in_file.stat().st_size)
-            if out_file.exists():
-                out = partly_read(out_file, length, out_file.stat().st_size)
+            ans = _in = 'FILE NOT FOUND'
+            if case.get('ans'):
+                ans = partly_read(ans_file, length, case['ans']['size'])
+            if case.get('in'):
+                _in = partly_read(in_file, length, case['in']['size'])
+            out = read_output(instance.id, name, length)
+            if out is None:
+                out = 'FILE NOT FOUND'
             return Response({'ans': ans, 'in': _in, 'out': out})
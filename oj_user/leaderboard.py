@@ -0,0 +1,71 @@
+"""The global user ranking, read from the ``stats`` rows."""
+from django.db.models import Q
+
+from . import stats
+from .models import UserStats
+from .serializers import UserBriefSerializer
+
+ORDERING = ['-solved', '-accepted', 'user_id']
+
+
+def _after(solved, accepted, user_id):
+    """Rows that come after the given key in leaderboard order."""
+    return (Q(solved__lt=solved)
+            | Q(solved=solved, accepted__lt=accepted)
+            | Q(solved=solved, accepted=accepted, user_id__gt=user_id))
+
+
+def get_rank(solved, accepted):
+    """1 + the number of users strictly ahead.
+
+    Two range counts on the leaderboard index, an OR of both would make
+    the database scan it instead of seeking.
+    """
+    return (UserStats.objects.filter(solved__gt=solved).count() +
+            UserStats.objects.filter(solved=solved,
+                                     accepted__gt=accepted).count() + 1)
+
+
+def get_user_rank(user):
+    entry = stats.get(user)
+    return serialize(entry, get_rank(entry.solved, entry.accepted))
+
+
+def get_page(cursor=None, limit=50):
+    """``limit`` rows following ``cursor`` and the cursor of the next page.
+
+    ``cursor`` is the ``(solved, accepted, user_id)`` key of the last row
+    already seen, pages are read by seeking on the index, never by offset.
+    """
+    queryset = UserStats.objects.select_related('user').order_by(*ORDERING)
+    if cursor is not None:
+        queryset = queryset.filter(_after(*cursor))
+    entries = list(queryset[:limit + 1])
+    entries, more = entries[:limit], len(entries) > limit
+    if not entries:
+        return [], None
+    first = entries[0]
+    rank = get_rank(first.solved, first.accepted)
+    position = rank + UserStats.objects.filter(
+        solved=first.solved,
+        accepted=first.accepted,
+        user_id__lt=first.user_id,
+    ).count()
+    res, last = [], None
+    for index, entry in enumerate(entries):
+        key = (entry.solved, entry.accepted)
+        if last is not None and key != last:
+            rank = position + index
+        last = key
+        res.append(serialize(entry, rank))
+    next_cursor = (last[0], last[1], entries[-1].user_id) if more else None
+    return res, next_cursor
+
+
+def serialize(entry, rank):
+    return {
+        **UserBriefSerializer(entry.user).data,
+        'rank': rank,
+        'solved': entry.solved,
+        'accepted': entry.accepted,
+    }
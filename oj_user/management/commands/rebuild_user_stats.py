@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from oj_user import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute user statistics and the leaderboard from submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = stats.rebuild(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} users.'))
@@ -92,3 +92,24 @@ class Group(BaseGroup):
         proxy = True
         verbose_name = _('group')
         verbose_name_plural = _('groups')
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        verbose_name=_('user'),
+        related_name='stats',
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    submissions = models.IntegerField(_('submissions'), default=0)
+    accepted = models.IntegerField(_('accepted'), default=0)
+    solved = models.IntegerField(_('solved'), default=0)
+    languages = models.JSONField(_('submissions per language'),
+                                 default=dict)
+    statuses = models.JSONField(_('submissions per status'), default=dict)
+
+    class Meta:
+        verbose_name = _('user statistics')
+        verbose_name_plural = _('user statistics')
+        indexes = [models.Index(fields=['-solved', '-accepted', 'user'])]
@@ -1,13 +1,12 @@
 from django.db.models import Q
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from . import stats
 from .models import User
-from oj_contest.models import Contest
-from oj_problem.serializers import (ProblemBriefSerializer,
-                                    ProblemSolveSerializer)
-from oj_submission.models import StatusChoices, Submission
+from oj_contest import running
+from oj_problem.serializers import ProblemBriefSerializer
+from oj_submission.models import Submission
 
 
 class UserBriefSerializer(serializers.ModelSerializer):
@@ -50,45 +49,43 @@ class UserSubmissionField(serializers.ListField):
 
     def to_representation(self, value):
         user = self.context['request'].user
-        if not value.exists():
-            return []
-        elif 'submission' not in user.permissions and not value.first(
-        ).user == user:
-            processing_contest = Contest.objects.filter(
-                start_time__lt=timezone.now(), end_time__gt=timezone.now())
+        owner = value.instance
+        value = value.select_related('user', 'problem')
+        if 'submission' not in user.permissions and owner.id != user.id:
             value = value.exclude(
                 Q(_is_hidden=True) | Q(problem___is_hidden=True)
-                | Q(problem__hide_submissions=True)
-                | Q(problem__contests__contest__in=processing_contest)
-            ).distinct()
+                | Q(problem___hide_submissions=True)
+                | Q(problem__in=running.problem_ids()))
         return _SubmissionSerializer(value.order_by('-id')[:10],
                                      many=True).data
 
 
-class AcceptedCountField(serializers.ReadOnlyField):
+class StatsField(serializers.ReadOnlyField):
+    """One value of the user's ``UserStats`` row."""
 
-    def to_internal_value(self, data):
-        pass
+    def __init__(self, name, **kwargs):
+        self.name = name
+        super().__init__(source='*', **kwargs)
 
     def to_representation(self, value):
-        return value.filter(status=StatusChoices.ACCEPTED).count()
+        return getattr(stats.get(value), self.name)
 
 
 class UserDetailSerializer(serializers.ModelSerializer):
-    solved_problems = ProblemSolveSerializer(source='problem_solve',
-                                             many=True,
-                                             read_only=True)
-    submission_count = serializers.IntegerField(read_only=True,
-                                                source='submissions.count')
-    accepted_count = AcceptedCountField(source='submissions')
+    solved_count = StatsField('solved')
+    submission_count = StatsField('submissions')
+    accepted_count = StatsField('accepted')
+    language_counts = StatsField('languages')
+    status_counts = StatsField('statuses')
     submissions = UserSubmissionField(read_only=True)
 
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'real_name', 'student_id',
-            'permissions', 'avatar', 'solved_problems', 'submission_count',
-            'accepted_count', 'submissions'
+            'permissions', 'avatar', 'solved_count', 'submission_count',
+            'accepted_count', 'language_counts', 'status_counts',
+            'submissions'
         ]
 
 
@@ -0,0 +1,95 @@
+"""Per-user submission statistics, updated as submissions are judged.
+
+The leaderboard ranks users by the same rows, see ``leaderboard``.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from oj_problem.models import ProblemSolve
+from oj_submission.models import StatusChoices, Submission
+
+from .models import User, UserStats
+
+# Not judged yet, these have no status to count.
+UNFINISHED = [StatusChoices.PENDING, StatusChoices.JUDGING]
+
+
+def _merge(counts, deltas):
+    counts = Counter(counts)
+    counts.update({str(i): j for i, j in deltas.items()})
+    return {i: j for i, j in counts.items() if j}
+
+
+def incr(user_id,
+         submissions=0,
+         accepted=0,
+         solved=0,
+         languages=None,
+         statuses=None):
+    """Apply a change of ``user_id``'s counts.
+
+    ``languages`` and ``statuses`` map a language or status to its change.
+    """
+    with transaction.atomic():
+        entry = UserStats.objects.select_for_update().filter(
+            user_id=user_id).first()
+        if entry is None:
+            # First entry of the user, the change is already in the tables.
+            recount([user_id])
+            return
+        entry.submissions = F('submissions') + submissions
+        entry.accepted = F('accepted') + accepted
+        entry.solved = F('solved') + solved
+        entry.languages = _merge(entry.languages, languages or {})
+        entry.statuses = _merge(entry.statuses, statuses or {})
+        entry.save()
+
+
+def recount(user_ids):
+    """Recompute the rows of ``user_ids`` from scratch."""
+    entries = {
+        i: UserStats(user_id=i, languages={}, statuses={})
+        for i in user_ids
+    }
+    submissions = Submission.objects.filter(user__in=user_ids)
+    for i in submissions.values('user_id').annotate(
+            count=Count('id'),
+            accepted=Count('id', filter=Q(status=StatusChoices.ACCEPTED))):
+        entries[i['user_id']].submissions = i['count']
+        entries[i['user_id']].accepted = i['accepted']
+    for i in submissions.values('user_id', 'language').annotate(
+            count=Count('id')):
+        entries[i['user_id']].languages[i['language']] = i['count']
+    for i in submissions.exclude(status__in=UNFINISHED).values(
+            'user_id', 'status').annotate(count=Count('id')):
+        entries[i['user_id']].statuses[str(i['status'])] = i['count']
+    for i in ProblemSolve.objects.filter(user__in=user_ids).values(
+            'user_id').annotate(count=Count('id')):
+        entries[i['user_id']].solved = i['count']
+    with transaction.atomic():
+        UserStats.objects.filter(user__in=user_ids).delete()
+        UserStats.objects.bulk_create(entries.values(), ignore_conflicts=True)
+    return len(user_ids)
+
+
+def rebuild(chunk_size=1000):
+    total = last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list(
+                'id', flat=True)[:chunk_size])
+        if not user_ids:
+            return total
+        total += recount(user_ids)
+        last_id = user_ids[-1]
+
+
+def get(user):
+    """``user``'s row, counted on first use."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        recount([user.id])
+        user.stats = UserStats.objects.get(user=user)
+        return user.stats
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import stats
+
+
+@shared_task
+def rebuild_user_stats():
+    return stats.rebuild()
@@ -7,6 +7,7 @@ from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from oj_backend.permissions import Granted, IsAuthenticatedAndReadOnly, ReadOnly, Captcha
+from oj_problem.serializers import ProblemSolveSerializer
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError, PermissionDenied
 from rest_framework.filters import OrderingFilter, SearchFilter
@@ -15,9 +16,11 @@ from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.status import HTTP_204_NO_CONTENT, HTTP_401_UNAUTHORIZED
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from . import leaderboard
 from .models import User
 from .serializers import (ChangePasswordSerializer, LoginSerializer,
                           UserBriefSerializer, UserDetailSerializer,
@@ -69,6 +72,11 @@ class UserViewSet(ReadOnlyModelViewSet, DestroyAPIView):
     filterset_fields = []
     queryset = User.objects.order_by('id')
 
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            return self.queryset.select_related('stats')
+        return self.queryset
+
     def get_serializer_class(self):
         if self.action == 'list':
             return UserBriefSerializer
@@ -106,9 +114,41 @@ class UserViewSet(ReadOnlyModelViewSet, DestroyAPIView):
         user.save()
         return Response(status=HTTP_204_NO_CONTENT)
 
+    @action(detail=True, methods=['get'], url_path='solved')
+    def get_solved(self, request, pk):
+        user = self.get_object()
+        page = self.paginate_queryset(
+            user.problem_solve.select_related('problem').order_by('-id'))
+        return self.get_paginated_response(
+            ProblemSolveSerializer(page, many=True).data)
+
     @action(detail=False, methods=['get'], url_path='ranking')
     def get_ranking(self, request):
-        ...
+        paginator = UserPagination()
+        limit = paginator.get_limit(request)
+        cursor = request.query_params.get('cursor')
+        if cursor is not None:
+            try:
+                solved, accepted, user_id = map(int, cursor.split(','))
+            except ValueError:
+                raise ValidationError(_('Invalid cursor.'))
+            cursor = (solved, accepted, user_id)
+        users, cursor = leaderboard.get_page(cursor, limit)
+        url = request.build_absolute_uri()
+        return Response({
+            'results':
+            users,
+            'next':
+            None if cursor is None else replace_query_param(
+                url, 'cursor', ','.join(map(str, cursor))),
+        })
+
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=[IsAuthenticated],
+            url_path='ranking/me')
+    def get_my_ranking(self, request):
+        return Response(leaderboard.get_user_rank(request.user))
 
 
 class LoginView(GenericAPIView):